@@ -0,0 +1,223 @@
+"""
+Django Management Command: Setup Workflows
+
+Creates the workflow definitions, states, and transitions for purchase orders
+and invoices. Re-running the command updates existing states and transitions
+to match the configuration below.
+
+Usage:
+    python manage.py setup_workflows                     # Purchase order and invoice workflows
+    python manage.py setup_workflows --workflow po       # Purchase order workflow only
+    python manage.py setup_workflows --workflow invoice  # Invoice workflow only
+    python manage.py setup_workflows --parallel          # Set up the workflows concurrently
+    python manage.py setup_workflows --verify            # Re-read and report each workflow afterwards
+    python manage.py setup_workflows --verify -v 2       # ... including every state
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count, Prefetch
+from core.models import WorkflowDefinition, WorkflowState, Currency
+from core.workflow_factory import WorkflowConfig, build_workflow
+
+
+# Workflow configurations, keyed by the --workflow choice
+WORKFLOWS = {
+    'po': WorkflowConfig(
+        label='Purchase Order',
+        document_type='purchase_order',
+        defaults={
+            'name': 'Purchase Order Approval Workflow',
+            'initial_state': 'draft',
+            'requires_approval': True,
+            'approval_threshold_amount': Decimal('5000.00'),  # $5000 threshold for POs
+            'approval_permission': 'approve_purchase_orders',
+            'reactivation_permission': 'reactivate_documents'
+        },
+        states=(
+            ('draft', 'Draft', '#6c757d', 0, False, False),
+            ('pending_approval', 'Pending Approval', '#fd7e14', 1, False, True),
+            ('approved', 'Approved', '#20c997', 2, False, False),
+            ('in_progress', 'In Progress', '#0d6efd', 3, False, False),
+            ('complete', 'Complete', '#198754', 4, False, False),
+            ('closed', 'Closed', '#495057', 5, True, False),
+            ('rejected', 'Rejected', '#dc3545', 6, False, False),
+        ),
+        transitions=(
+            ('draft', 'pending_approval', 'Submit for Approval', 'submit_for_approval', False, 'orange'),
+            ('draft', 'approved', 'Auto-Approve & Start', 'approve_purchase_orders', False, 'green'),
+            ('pending_approval', 'approved', 'Approve', 'approve_purchase_orders', False, 'green'),
+            ('pending_approval', 'rejected', 'Reject', 'approve_purchase_orders', False, 'red'),
+            ('pending_approval', 'draft', 'Return to Draft', '', False, 'gray'),
+            ('approved', 'in_progress', 'Start Processing', '', False, 'blue'),
+            ('approved', 'draft', 'Reactivate', 'reactivate_documents', False, 'orange'),
+            ('in_progress', 'complete', 'Mark Complete', '', False, 'green'),
+            ('in_progress', 'draft', 'Reactivate', 'reactivate_documents', False, 'orange'),
+            ('complete', 'closed', 'Close', '', False, 'gray'),
+            ('complete', 'in_progress', 'Reactivate', 'reactivate_documents', False, 'orange'),
+            ('closed', 'in_progress', 'Reactivate', 'reactivate_documents', False, 'orange'),
+            ('rejected', 'draft', 'Return to Draft', '', False, 'blue'),
+        ),
+    ),
+    'invoice': WorkflowConfig(
+        label='Invoice',
+        document_type='invoice',
+        defaults={
+            'name': 'Standard Invoice Workflow',
+            'initial_state': 'draft',
+            'requires_approval': True,
+            'approval_threshold_amount': Decimal('1000.00'),  # $1000 threshold like sales orders
+            'approval_permission': 'invoice_approve',
+            'reactivation_permission': 'invoice_reactivate'
+        },
+        states=(
+            ('draft', 'Draft', '#6c757d', 10, False, False),
+            ('pending_approval', 'Pending Approval', '#fd7e14', 20, False, True),
+            ('rejected', 'Rejected', '#dc3545', 25, False, False),
+            ('approved', 'Approved', '#20c997', 30, False, False),
+            ('sent', 'Sent', '#0d6efd', 40, False, False),
+            ('partial_payment', 'Partially Paid', '#ffc107', 50, False, False),
+            ('overdue', 'Overdue', '#dc3545', 55, False, False),
+            ('paid', 'Paid', '#198754', 60, True, False),
+            ('cancelled', 'Cancelled', '#495057', 70, True, False),
+        ),
+        transitions=(
+            # From Draft
+            ('draft', 'pending_approval', 'Submit for Approval', '', False, 'orange'),
+            ('draft', 'approved', 'Auto Approve', '', False, 'green'),
+            ('draft', 'cancelled', 'Cancel', '', False, 'red'),
+            # From Pending Approval
+            ('pending_approval', 'approved', 'Approve', '', False, 'green'),
+            ('pending_approval', 'rejected', 'Reject', '', False, 'red'),
+            # From Approved
+            ('approved', 'sent', 'Send to Customer', '', False, 'blue'),
+            ('approved', 'cancelled', 'Cancel', '', False, 'red'),
+            # From Sent
+            ('sent', 'paid', 'Record Payment', '', False, 'green'),
+            ('sent', 'partial_payment', 'Partial Payment', '', False, 'orange'),
+            ('sent', 'overdue', 'Mark Overdue', '', False, 'red'),
+            # From Partial Payment
+            ('partial_payment', 'paid', 'Complete Payment', '', False, 'green'),
+            ('partial_payment', 'overdue', 'Mark Overdue', '', False, 'red'),
+            # From Overdue
+            ('overdue', 'paid', 'Record Payment', '', False, 'green'),
+            ('overdue', 'partial_payment', 'Partial Payment', '', False, 'orange'),
+            # From Rejected
+            ('rejected', 'draft', 'Return to Draft', '', False, 'blue'),
+            ('rejected', 'cancelled', 'Cancel', '', False, 'red'),
+        ),
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = 'Create the purchase order and invoice workflow definitions, states, and transitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workflow',
+            choices=[*WORKFLOWS, 'all'],
+            default='all',
+            help='Which workflow to set up (default: all)',
+        )
+        parser.add_argument(
+            '--parallel',
+            action='store_true',
+            help='Set up the selected workflows concurrently, each on its own database connection',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Re-read each workflow after setup and report its state and transition counts',
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+
+        selected = list(WORKFLOWS) if options['workflow'] == 'all' else [options['workflow']]
+
+        # Approval thresholds are USD amounts
+        Currency.objects.get_or_create(
+            iso_code='USD',
+            defaults={'name': 'US Dollar', 'symbol': '$'}
+        )
+
+        if options['parallel'] and len(selected) > 1:
+            # Workflows share no rows (one definition per document_type), so
+            # each can run in its own thread, connection and transaction. Not
+            # the default: worker connections can't see a caller's open
+            # transaction, e.g. call_command() inside a TestCase.
+            with ThreadPoolExecutor(max_workers=len(selected)) as executor:
+                list(executor.map(self.setup_workflow_in_thread, [WORKFLOWS[key] for key in selected]))
+        else:
+            for key in selected:
+                self.setup_workflow(WORKFLOWS[key])
+
+        # The setup already reports what it synced; verification re-reads the
+        # database, so it only runs when asked for
+        if options['verify']:
+            for key in selected:
+                self.verify_workflow(WORKFLOWS[key], list_states=options['verbosity'] >= 2)
+
+        self.stdout.write(self.style.SUCCESS("\n✅ Setup completed successfully!"))
+
+    def setup_workflow_in_thread(self, config):
+        """Run setup_workflow on a worker thread, closing the thread's database connections afterwards"""
+        try:
+            return self.setup_workflow(config)
+        finally:
+            connections.close_all()
+
+    def setup_workflow(self, config):
+        """Create or update one workflow from its WorkflowConfig"""
+
+        self.stdout.write(f"🔧 Setting up {config.label} Workflow...")
+
+        # Progress lines are collected and written in one go at the end
+        log = []
+        workflow_def = build_workflow(config, log)
+
+        log.append(f"\n🎉 {config.label} Workflow Setup Complete!")
+        log.append(f"💰 Approval threshold: ${workflow_def.approval_threshold_amount}")
+        log.append(f"🔐 Required permissions: {workflow_def.approval_permission}, {workflow_def.reactivation_permission}")
+        self.stdout.write("\n".join(log))
+
+        return workflow_def
+
+    def verify_workflow(self, config, list_states=False):
+        """Verify a workflow setup, optionally listing its states"""
+        self.stdout.write(f"\n🔍 Verifying {config.label} Workflow Setup...")
+
+        try:
+            # Counts come back with the definition in one query. distinct=True
+            # stops the two joins from multiplying each other's counts.
+            workflows = WorkflowDefinition.objects.annotate(
+                n_states=Count('states', distinct=True),
+                n_transitions=Count('transitions', distinct=True)
+            )
+            if list_states:
+                # The ordered states are prefetched in one extra query
+                workflows = workflows.prefetch_related(
+                    Prefetch('states', queryset=WorkflowState.objects.order_by('order'))
+                )
+            workflow = workflows.get(document_type=config.document_type)
+
+            log = []
+            log.append(f"✅ Workflow Definition: {workflow.name}")
+            log.append(f"✅ States: {workflow.n_states}")
+            log.append(f"✅ Transitions: {workflow.n_transitions}")
+            log.append(f"✅ Approval Threshold: ${workflow.approval_threshold_amount}")
+
+            if list_states:
+                log.append("\n📋 Available States:")
+                for state in workflow.states.all():
+                    log.append(f"  • {state.display_name} ({state.name}) - {state.color_code}")
+            self.stdout.write("\n".join(log))
+
+            return True
+
+        except WorkflowDefinition.DoesNotExist:
+            self.stdout.write(f"❌ {config.label} workflow not found!")
+            return False
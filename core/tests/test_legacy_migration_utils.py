@@ -0,0 +1,177 @@
+import importlib.util
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from djmoney.money import Money
+
+from core.models import Currency, WorkflowDefinition, WorkflowState
+
+
+def _load_legacy_utils():
+    """Load scripts/migrations/legacy/_utils.py, which the legacy scripts import from their own directory"""
+    path = settings.BASE_DIR / 'scripts' / 'migrations' / 'legacy' / '_utils.py'
+    spec = importlib.util.spec_from_file_location('legacy_migration_utils', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+legacy_utils = _load_legacy_utils()
+
+
+class CopyValueTests(TestCase):
+    """Tests for rendering values as COPY text-format fields"""
+
+    def test_none_is_null_marker(self):
+        self.assertEqual(legacy_utils.copy_value(None), r'\N')
+
+    def test_booleans(self):
+        self.assertEqual(legacy_utils.copy_value(True), 't')
+        self.assertEqual(legacy_utils.copy_value(False), 'f')
+
+    def test_escapes_special_characters(self):
+        self.assertEqual(legacy_utils.copy_value('a\tb'), r'a\tb')
+        self.assertEqual(legacy_utils.copy_value('a\nb'), r'a\nb')
+        self.assertEqual(legacy_utils.copy_value('a\rb'), r'a\rb')
+        self.assertEqual(legacy_utils.copy_value('a\\b'), r'a\\b')
+        # Backslashes are escaped before the escapes they introduce
+        self.assertEqual(legacy_utils.copy_value('\\t\t'), r'\\t\t')
+
+    def test_null_marker_text_is_not_null(self):
+        self.assertEqual(legacy_utils.copy_value(r'\N'), r'\\N')
+
+    def test_numbers_dates_and_uuids(self):
+        value = uuid.UUID('12345678-1234-5678-1234-567812345678')
+        self.assertEqual(legacy_utils.copy_value(Decimal('1234.50')), '1234.50')
+        self.assertEqual(legacy_utils.copy_value(42), '42')
+        self.assertEqual(legacy_utils.copy_value(date(2024, 1, 2)), '2024-01-02')
+        self.assertEqual(
+            legacy_utils.copy_value(datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc)),
+            '2024-01-02T03:04:05+00:00'
+        )
+        self.assertEqual(legacy_utils.copy_value(value), '12345678-1234-5678-1234-567812345678')
+
+
+class LegacyKeyTests(TestCase):
+    """Tests for keying legacy_ids like iDempiere IDs"""
+
+    def test_numeric_ids_become_ints(self):
+        self.assertEqual(legacy_utils.legacy_key('1000123'), 1000123)
+        self.assertEqual(legacy_utils.legacy_key('-1'), -1)
+
+    def test_other_ids_are_kept(self):
+        self.assertEqual(legacy_utils.legacy_key('ABC-1'), 'ABC-1')
+        self.assertEqual(legacy_utils.legacy_key(''), '')
+        self.assertIsNone(legacy_utils.legacy_key(None))
+
+
+class ToDecimalTests(TestCase):
+    """Tests for converting legacy numeric values to Decimal"""
+
+    def test_none_is_zero(self):
+        self.assertEqual(legacy_utils.to_decimal(None), Decimal('0'))
+
+    def test_decimal_is_passed_through(self):
+        value = Decimal('12.34')
+        self.assertIs(legacy_utils.to_decimal(value), value)
+
+    def test_other_types_convert_through_str(self):
+        self.assertEqual(legacy_utils.to_decimal(0.1), Decimal('0.1'))
+        self.assertEqual(legacy_utils.to_decimal(7), Decimal('7'))
+        self.assertEqual(legacy_utils.to_decimal('3.50'), Decimal('3.50'))
+
+
+class CopyLoaderTests(TestCase):
+    """Round-trip tests for the COPY loaders"""
+
+    def test_copy_rows(self):
+        row_id = uuid.uuid4()
+        now = datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc)
+        columns = ['id', 'created', 'updated', 'is_active', 'legacy_id',
+                   'iso_code', 'symbol', 'name', 'precision', 'is_base_currency']
+
+        legacy_utils.copy_rows(Currency._meta.db_table, columns, [
+            (row_id, now, now, True, None, 'XTS', '\\', 'Tab\there\nand newline', 2, False),
+        ])
+
+        currency = Currency.objects.get(pk=row_id)
+        self.assertEqual(currency.symbol, '\\')
+        self.assertEqual(currency.name, 'Tab\there\nand newline')
+        self.assertIsNone(currency.legacy_id)
+        self.assertEqual(currency.created, now)
+        self.assertTrue(currency.is_active)
+        self.assertFalse(currency.is_base_currency)
+
+    def test_copy_instances_applies_field_defaults_and_pre_save(self):
+        currency = Currency(iso_code='XTS', symbol='¤', name='Test currency', legacy_id='100')
+
+        legacy_utils.copy_instances(Currency, [currency])
+
+        saved = Currency.objects.get(pk=currency.pk)
+        self.assertEqual(saved.name, 'Test currency')
+        self.assertEqual(saved.legacy_id, '100')
+        self.assertEqual(saved.precision, 2)
+        self.assertTrue(saved.is_active)
+        # auto_now/auto_now_add are filled in by pre_save, as bulk_create would
+        self.assertIsNotNone(saved.created)
+        self.assertIsNotNone(saved.updated)
+
+    def test_copy_instances_writes_money_amount_and_currency(self):
+        workflow = WorkflowDefinition(
+            name='Copied workflow',
+            document_type='copied_document',
+            approval_threshold_amount=Money(Decimal('1234.56'), 'EUR'),
+        )
+
+        legacy_utils.copy_instances(WorkflowDefinition, [workflow])
+
+        saved = WorkflowDefinition.objects.get(pk=workflow.pk)
+        self.assertEqual(saved.approval_threshold_amount, Money(Decimal('1234.56'), 'EUR'))
+
+    def test_copy_instances_ignores_empty_list(self):
+        legacy_utils.copy_instances(Currency, [])
+
+        self.assertFalse(Currency.objects.filter(iso_code='XTS').exists())
+
+
+class IndexToggleTests(TestCase):
+    """Tests for dropping and rebuilding a table's indexes and foreign keys"""
+
+    table = WorkflowState._meta.db_table
+
+    def index_definitions(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT pg_get_indexdef(indexrelid)
+                FROM pg_index
+                WHERE indrelid = %s::regclass AND NOT indisunique AND NOT indisprimary
+            """, [self.table])
+            return sorted(definition for (definition,) in cursor.fetchall())
+
+    def foreign_key_names(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = %s::regclass AND contype = 'f'
+            """, [self.table])
+            return sorted(name for (name,) in cursor.fetchall())
+
+    def test_disable_and_enable_restore_indexes_and_foreign_keys(self):
+        indexes_before = self.index_definitions()
+        foreign_keys_before = self.foreign_key_names()
+        self.assertTrue(indexes_before)
+        self.assertTrue(foreign_keys_before)
+
+        indexes, foreign_keys = legacy_utils.disable_indexes(self.table)
+
+        self.assertEqual(self.index_definitions(), [])
+        self.assertEqual(self.foreign_key_names(), [])
+
+        legacy_utils.enable_indexes(self.table, indexes, foreign_keys)
+
+        self.assertEqual(self.index_definitions(), indexes_before)
+        self.assertEqual(self.foreign_key_names(), foreign_keys_before)
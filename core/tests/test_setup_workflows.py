@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.management.commands.setup_workflows import WORKFLOWS
+from core.models import Currency, WorkflowDefinition, WorkflowState, WorkflowTransition
+
+
+class SetupWorkflowsCommandTests(TestCase):
+    """Tests for the setup_workflows management command"""
+
+    def run_command(self, **options):
+        stdout = StringIO()
+        call_command('setup_workflows', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def assert_matches_configs(self, keys):
+        self.assertEqual(WorkflowDefinition.objects.count(), len(keys))
+        for key in keys:
+            config = WORKFLOWS[key]
+            workflow = WorkflowDefinition.objects.get(document_type=config.document_type)
+            self.assertEqual(workflow.states.count(), len(config.states))
+            self.assertEqual(workflow.transitions.count(), len(config.transitions))
+
+    def test_creates_all_workflows(self):
+        self.run_command(workflow='all')
+
+        self.assert_matches_configs(list(WORKFLOWS))
+        self.assertTrue(Currency.objects.filter(iso_code='USD').exists())
+
+    def test_is_idempotent(self):
+        self.run_command(workflow='all')
+        workflow_ids = set(WorkflowDefinition.objects.values_list('id', flat=True))
+        state_ids = set(WorkflowState.objects.values_list('id', flat=True))
+        transition_ids = set(WorkflowTransition.objects.values_list('id', flat=True))
+
+        self.run_command(workflow='all')
+
+        self.assert_matches_configs(list(WORKFLOWS))
+        self.assertEqual(set(WorkflowDefinition.objects.values_list('id', flat=True)), workflow_ids)
+        self.assertEqual(set(WorkflowState.objects.values_list('id', flat=True)), state_ids)
+        self.assertEqual(set(WorkflowTransition.objects.values_list('id', flat=True)), transition_ids)
+        self.assertEqual(Currency.objects.filter(iso_code='USD').count(), 1)
+
+    def test_rerun_restores_configured_values(self):
+        self.run_command(workflow='po')
+        WorkflowState.objects.filter(workflow__document_type='purchase_order', name='draft').update(
+            display_name='Edited', color_code='#000000'
+        )
+        WorkflowTransition.objects.filter(workflow__document_type='purchase_order').update(button_color='gray')
+
+        self.run_command(workflow='po')
+
+        config = WORKFLOWS['po']
+        states = {
+            state.name: state
+            for state in WorkflowState.objects.filter(workflow__document_type=config.document_type)
+        }
+        for name, display_name, color, order, is_final, requires_approval in config.states:
+            self.assertEqual(states[name].display_name, display_name)
+            self.assertEqual(states[name].color_code, color)
+            self.assertEqual(states[name].order, order)
+            self.assertEqual(states[name].is_final, is_final)
+            self.assertEqual(states[name].requires_approval, requires_approval)
+
+        transitions = {
+            (transition.from_state.name, transition.to_state.name): transition
+            for transition in WorkflowTransition.objects.filter(
+                workflow__document_type=config.document_type
+            ).select_related('from_state', 'to_state')
+        }
+        for from_name, to_name, name, permission, requires_approval, color in config.transitions:
+            transition = transitions[(from_name, to_name)]
+            self.assertEqual(transition.name, name)
+            self.assertEqual(transition.required_permission, permission)
+            self.assertEqual(transition.button_color, color)
+
+    def test_single_workflow(self):
+        self.run_command(workflow='invoice')
+
+        self.assert_matches_configs(['invoice'])
+
+    def test_verify_reports_counts(self):
+        output = self.run_command(workflow='all', verify=True)
+
+        for config in WORKFLOWS.values():
+            self.assertIn(f"Verifying {config.label} Workflow Setup", output)
+        self.assertIn(f"States: {len(WORKFLOWS['po'].states)}", output)
+        self.assertIn(f"Transitions: {len(WORKFLOWS['po'].transitions)}", output)
+        self.assertIn(f"Transitions: {len(WORKFLOWS['invoice'].transitions)}", output)
+        self.assertNotIn("Available States", output)
+
+    def test_verify_lists_states_at_verbosity_2(self):
+        output = self.run_command(workflow='po', verify=True, verbosity=2)
+
+        self.assertIn("Available States", output)
+        for name, display_name, color, *_ in WORKFLOWS['po'].states:
+            self.assertIn(f"{display_name} ({name}) - {color}", output)
+
+    def test_without_verify_skips_verification(self):
+        output = self.run_command(workflow='po')
+
+        self.assertNotIn("Verifying", output)
+        self.assertIn("Setup completed successfully", output)
@@ -0,0 +1,108 @@
+"""
+Workflow factory for Modern ERP.
+Creates or updates a workflow definition with its states and transitions
+from a declarative WorkflowConfig.
+"""
+
+from dataclasses import dataclass
+from django.db import transaction
+from core.models import WorkflowDefinition, WorkflowState, WorkflowTransition
+
+
+@dataclass(frozen=True, slots=True)
+class WorkflowConfig:
+    """
+    Declarative description of a document workflow.
+
+    states:      (name, display_name, color_code, order, is_final, requires_approval)
+    transitions: (from_state, to_state, name, required_permission, requires_approval, button_color)
+    """
+    label: str
+    document_type: str
+    defaults: dict
+    states: tuple
+    transitions: tuple
+
+
+@transaction.atomic
+def build_workflow(config, log=None):
+    """
+    Create or update a workflow definition, its states and its transitions.
+
+    The definition is only created if missing; states and transitions are
+    upserted so re-running brings them in line with the config. Progress
+    lines are appended to log when one is given.
+
+    Returns the WorkflowDefinition.
+    """
+    if log is None:
+        log = []
+
+    workflow_def, created = WorkflowDefinition.objects.get_or_create(
+        document_type=config.document_type,
+        defaults=config.defaults
+    )
+
+    if created:
+        log.append(f"✅ Created workflow definition: {workflow_def.name}")
+    else:
+        log.append(f"🔄 Workflow definition already exists: {workflow_def.name}")
+
+    # Upsert the states in one INSERT ... ON CONFLICT: new states are
+    # created and existing ones are brought in line with the config
+    state_objs = [
+        WorkflowState(
+            workflow=workflow_def,
+            name=state_name,
+            display_name=display_name,
+            color_code=color,
+            order=order,
+            is_final=is_final,
+            requires_approval=requires_approval
+        )
+        for state_name, display_name, color, order, is_final, requires_approval in config.states
+    ]
+    WorkflowState.objects.bulk_create(
+        state_objs,
+        update_conflicts=True,
+        unique_fields=['workflow', 'name'],
+        update_fields=['display_name', 'color_code', 'order', 'is_final', 'requires_approval', 'updated']
+    )
+    for state in state_objs:
+        log.append(f"  ✅ State: {state.display_name} ({state.color_code})")
+
+    # Get state ids for transitions. Upserted rows that already existed
+    # keep their database id, not the one generated on the instance above.
+    state_ids = dict(WorkflowState.objects.filter(workflow=workflow_def).values_list('name', 'id'))
+
+    # Upsert the transitions, keyed on their (from, to) state pair
+    transition_objs = []
+    for from_name, to_name, action_name, permission, requires_approval, color in config.transitions:
+        from_id = state_ids.get(from_name)
+        to_id = state_ids.get(to_name)
+
+        if from_id and to_id:
+            transition_objs.append(WorkflowTransition(
+                workflow=workflow_def,
+                from_state_id=from_id,
+                to_state_id=to_id,
+                name=action_name,
+                required_permission=permission,
+                requires_approval=requires_approval,
+                button_color=color
+            ))
+
+    WorkflowTransition.objects.bulk_create(
+        transition_objs,
+        update_conflicts=True,
+        unique_fields=['workflow', 'from_state', 'to_state'],
+        update_fields=['name', 'required_permission', 'requires_approval', 'button_color', 'updated']
+    )
+    state_names = {state_id: name for name, state_id in state_ids.items()}
+    for transition in transition_objs:
+        log.append(f"  ✅ Transition: {state_names[transition.from_state_id]} → "
+                   f"{state_names[transition.to_state_id]} ({transition.name})")
+
+    log.append(f"📊 Synced {len(state_objs)} states and {len(transition_objs)} transitions")
+
+    return workflow_def
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0016_auto_20250624_1828'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(fields=('legacy_id',), name='uniq_invoice_legacy'),
+        ),
+    ]
@@ -503,6 +503,9 @@ class Invoice(BaseModel):
     
     class Meta:
         ordering = ['-date_invoiced', 'document_no']
+        constraints = [
+            models.UniqueConstraint(fields=['legacy_id'], name='uniq_invoice_legacy'),
+        ]
         
     def __str__(self):
         # Add INV- prefix for display
@@ -0,0 +1,150 @@
+"""
+Shared helpers for the legacy iDempiere migration scripts.
+"""
+
+import io
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from django.db import connection
+
+# Rows fetched per round trip while building legacy maps
+MAP_CHUNK_SIZE = 2000
+
+# iDempiere docstatus codes mapped to Modern ERP doc_status values
+DOC_STATUS_MAP = {
+    'DR': 'drafted',
+    'IP': 'in_progress',
+    'CO': 'complete',
+    'CL': 'closed',
+    'RE': 'reversed',
+    'VO': 'voided'
+}
+
+# Only sales orders have a waiting_payment status
+SALES_ORDER_DOC_STATUS_MAP = {**DOC_STATUS_MAP, 'WP': 'waiting_payment'}
+
+# Shared zero for missing or zero-valued amounts
+ZERO = Decimal('0')
+
+
+def legacy_key(legacy_id):
+    """Key a legacy_id the way iDempiere IDs arrive: int when numeric, else the raw string"""
+    if legacy_id and legacy_id.lstrip('-').isdigit():
+        return int(legacy_id)
+    return legacy_id
+
+
+def build_legacy_map(model, instances=False):
+    """Map legacy keys of a model's migrated rows to their primary keys (or model instances)"""
+    # iterator() streams rows through a server-side cursor instead of caching the whole queryset
+    queryset = model.objects.filter(legacy_id__isnull=False).exclude(legacy_id='')
+    if instances:
+        return {legacy_key(obj.legacy_id): obj for obj in queryset.iterator(chunk_size=MAP_CHUNK_SIZE)}
+    return {
+        legacy_key(legacy_id): pk
+        for legacy_id, pk in queryset.values_list('legacy_id', 'pk').iterator(chunk_size=MAP_CHUNK_SIZE)
+    }
+
+
+@lru_cache(maxsize=16384)
+def _decimal_from_str(value):
+    return Decimal(str(value))
+
+
+def to_decimal(value):
+    """Convert a legacy numeric value to Decimal, reusing instances where possible"""
+    if value is None:
+        return ZERO
+    if isinstance(value, Decimal):
+        # psycopg2 already returns numeric columns as Decimal
+        return value
+    # Most amounts repeat, so other types are converted once per distinct value
+    return _decimal_from_str(value)
+
+
+def copy_value(value):
+    """Render a prepared database value as a COPY text-format field"""
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def copy_rows(table, columns, rows):
+    """Load tuples of prepared values into the given table columns with a single COPY"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def copy_instances(model, instances):
+    """Load unsaved model instances into their table with a single COPY"""
+    if not instances:
+        return
+
+    fields = model._meta.concrete_fields
+    # Same value preparation as bulk_create, including auto_now timestamps
+    # and the raw amount/currency columns behind each MoneyField
+    rows = (
+        [field.get_db_prep_save(field.pre_save(instance, True), connection) for field in fields]
+        for instance in instances
+    )
+    columns = [connection.ops.quote_name(field.column) for field in fields]
+    copy_rows(model._meta.db_table, columns, rows)
+
+
+def disable_indexes(table):
+    """Drop non-unique indexes and foreign keys on a table, returning their definitions"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT i.relname, pg_get_indexdef(i.oid)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = %s::regclass
+              AND NOT x.indisunique
+              AND NOT x.indisprimary
+        """, [table])
+        indexes = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+        """, [table])
+        foreign_keys = cursor.fetchall()
+
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX "{name}"')
+
+    return indexes, foreign_keys
+
+
+def enable_indexes(table, indexes, foreign_keys):
+    """Recreate indexes and foreign keys dropped by disable_indexes"""
+    with connection.cursor() as cursor:
+        for _, definition in indexes:
+            # Plain CREATE INDEX: the load is offline anyway, and unlike CONCURRENTLY
+            # a failed build can't leave an invalid index behind
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            # Add without checking existing rows, then validate them in one pass
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition} NOT VALID')
+            cursor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT "{name}"')
@@ -22,32 +22,82 @@ Requirements:
 import os
 import sys
 import django
+import uuid
+import queue
+import threading
 import psycopg2
+import psycopg2.extras
 from decimal import Decimal
-from datetime import datetime
+from itertools import groupby, islice
+from operator import itemgetter
 from django.conf import settings
+from django.db import connection, transaction
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'modern_erp.settings')
 django.setup()
 
+# Adapt uuid.UUID values for raw psycopg2 inserts
+psycopg2.extras.register_uuid()
+
 from core.models import BusinessPartner, Organization, Currency, User, UnitOfMeasure
 from sales.models import SalesOrder, SalesOrderLine, Invoice, InvoiceLine, Shipment, ShipmentLine
 from purchasing.models import PurchaseOrder, PurchaseOrderLine, VendorBill, VendorBillLine, Receipt, ReceiptLine
-from inventory.models import Product, ProductCategory, Warehouse, PriceList
+from inventory.models import Product, Warehouse, PriceList
+
+from _utils import DOC_STATUS_MAP, SALES_ORDER_DOC_STATUS_MAP, copy_instances, disable_indexes, enable_indexes
+
+
+# Shared zero for missing line quantities and amounts
+_ZERO = Decimal('0.00')
+
+
+def _chunked(iterable, n):
+    """Yield successive lists of up to n items from any iterable"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, n)):
+        yield batch
+
+
+# Line tables whose secondary indexes and foreign keys are rebuilt after the bulk load
+_LINE_MODELS = [SalesOrderLine, PurchaseOrderLine, InvoiceLine, VendorBillLine, ShipmentLine, ReceiptLine]
 
 
 class iDempiereDataMigrator:
     """Migrates data from iDempiere to Modern ERP"""
     
+    # Number of parent documents whose lines are fetched and inserted together
+    LINE_BATCH_SIZE = 500
+
+    # Business partners are written with raw multi-row INSERTs, bypassing the ORM
+    BP_BATCH_SIZE = 1000
+    BP_INSERT_COLUMNS = (
+        'id', 'created', 'updated', 'created_by_id', 'updated_by_id', 'is_active', 'legacy_id',
+        'code', 'name', 'name2', 'partner_type', 'country', 'phone', 'email', 'website',
+        'tax_id', 'is_tax_exempt', 'credit_limit_currency', 'payment_terms',
+        'is_customer', 'is_vendor', 'is_employee', 'is_prospect', 'is_1099_vendor', 'is_orphan',
+    )
+    # Model defaults for the raw INSERT, so it can't drift from what the ORM would write
+    BP_DEFAULT_COUNTRY = BusinessPartner._meta.get_field('country').get_default()
+    BP_DEFAULT_CREDIT_LIMIT_CURRENCY = str(BusinessPartner._meta.get_field('credit_limit_currency').get_default())
+    BP_DEFAULT_PAYMENT_TERMS = BusinessPartner._meta.get_field('payment_terms').get_default()
+    
+    # Source rows are prefetched in chunks by a background reader thread
+    STREAM_CHUNK_SIZE = 2000
+    STREAM_QUEUE_CHUNKS = 4
+    # Seconds a blocked reader waits before re-checking whether the consumer stopped
+    STREAM_PUT_TIMEOUT = 1
+
+    OLD_DB_SETTINGS = {
+        'host': 'localhost',
+        'database': 'temp_idempiere',
+        'user': 'django_user',
+        'password': 'django_pass'
+    }
+    
     def __init__(self):
         # Database connections
-        self.old_db = psycopg2.connect(
-            host='localhost',
-            database='temp_idempiere',
-            user='django_user',
-            password='django_pass'
-        )
+        self.old_db = psycopg2.connect(**self.OLD_DB_SETTINGS)
         
         self.new_db = psycopg2.connect(
             host='localhost',
@@ -56,13 +106,7 @@ class iDempiereDataMigrator:
             password='django_pass'
         )
         
-        # Get default organization and user for migration
-        self.default_org = Organization.objects.first()
-        self.default_user = User.objects.first()
-        self.default_currency = Currency.objects.filter(iso_code='USD').first()
-        
-        if not all([self.default_org, self.default_user, self.default_currency]):
-            raise Exception("Please ensure you have at least one Organization, User, and USD Currency in the system")
+        self._load_defaults()
         
         # Migration statistics
         self.stats = {
@@ -74,14 +118,47 @@ class iDempiereDataMigrator:
             'errors': []
         }
     
+    def _load_defaults(self):
+        """Load every default reference used while building rows, once per migration.
+
+        Only primary keys are kept so rows can be built with *_id fields
+        instead of related objects.
+        """
+        self.default_org_id = Organization.objects.values_list('id', flat=True).first()
+        self.default_user_id = User.objects.values_list('id', flat=True).first()
+        self.default_currency_id = Currency.objects.filter(iso_code='USD').values_list('id', flat=True).first()
+        self.default_warehouse_id = Warehouse.objects.values_list('id', flat=True).first()
+        self.sales_price_list_id = PriceList.objects.filter(is_sales_price_list=True).values_list('id', flat=True).first()
+        self.purchase_price_list_id = PriceList.objects.filter(is_purchase_price_list=True).values_list('id', flat=True).first()
+        self.default_uom_id = UnitOfMeasure.objects.values_list('id', flat=True).first()
+
+        if not all([self.default_org_id, self.default_user_id, self.default_currency_id]):
+            raise Exception("Please ensure you have at least one Organization, User, and USD Currency in the system")
+        if not all([self.default_warehouse_id, self.sales_price_list_id, self.purchase_price_list_id, self.default_uom_id]):
+            raise Exception("Please ensure you have a Warehouse, a sales and a purchase Price List, and a Unit of Measure in the system")
+
+        # Legacy product ID -> product PK, extended as placeholders are created
+        self.product_map = dict(
+            Product.objects.filter(legacy_id__isnull=False).values_list('legacy_id', 'id')
+        )
+
+    def _load_business_partner_map(self):
+        """Map legacy business partner IDs to PKs once partners have been migrated"""
+        self.business_partner_map = dict(
+            BusinessPartner.objects.filter(legacy_id__isnull=False).values_list('legacy_id', 'id')
+        )
+
     def migrate_business_partners(self):
         """Migrate business partners from c_bpartner"""
         print("Migrating Business Partners...")
         
-        old_cursor = self.old_db.cursor()
+        new_cursor = self.new_db.cursor()
+        table = BusinessPartner._meta.db_table
+        staging_table = self._create_staging_table(new_cursor, table)
+        staged = 0
         
         # Get business partners from old system
-        old_cursor.execute("""
+        query = """
             SELECT 
                 c_bpartner_id,
                 value as search_key,
@@ -97,57 +174,115 @@ class iDempiereDataMigrator:
                 updatedby
             FROM adempiere.c_bpartner 
             WHERE issummary = 'N'
+              AND NOT (c_bpartner_id = ANY(%s))
             ORDER BY c_bpartner_id
+        """
+
+        invalid_ids = self._find_invalid_rows('Business Partner', """
+            SELECT c_bpartner_id, 'missing name'
+            FROM adempiere.c_bpartner
+            WHERE issummary = 'N' AND name IS NULL
         """)
-        
-        for row in old_cursor.fetchall():
-            try:
-                # Determine partner type based on flags
-                is_customer = (row[5] == 'Y')
-                is_vendor = (row[6] == 'Y')
-                
-                if is_customer and is_vendor:
-                    partner_type = 'customer'  # Default to customer if both
-                elif is_vendor:
-                    partner_type = 'vendor'
-                elif is_customer:
-                    partner_type = 'customer'
-                else:
-                    partner_type = 'other'  # Neither customer nor vendor
-                
-                bp = BusinessPartner.objects.create(
-                    # Map fields from old to new
-                    code=row[1] or f"BP{row[0]}",
-                    search_key=row[1] or f"BP{row[0]}",
-                    name=row[2],
-                    name2=row[3] or '',
-                    partner_type=partner_type,
-                    is_active=(row[7] == 'Y'),
-                    created=row[8],
-                    created_by=self.default_user,
-                    updated=row[9],
-                    updated_by=self.default_user,
-                    # Set migration reference
-                    legacy_id=str(row[0])
-                )
-                self.stats['business_partners'] += 1
-                
-            except Exception as e:
-                error_msg = f"Error migrating Business Partner ID {row[0]}: {str(e)}"
-                print(error_msg)
-                self.stats['errors'].append(error_msg)
-        
-        old_cursor.close()
+
+        rows = (self._build_business_partner_row(row) for row in self._stream_rows(query, (invalid_ids,)))
+        for batch in _chunked(rows, self.BP_BATCH_SIZE):
+            staged += self._insert_business_partners(new_cursor, staging_table, batch)
+
+        self.stats['business_partners'] = self._publish_staging_table(new_cursor, staging_table, table)
+        if staged > self.stats['business_partners']:
+            error_msg = f"Skipped {staged - self.stats['business_partners']} Business Partners that conflict with existing rows"
+            print(error_msg)
+            self.stats['errors'].append(error_msg)
+
+        new_cursor.close()
         print(f"Migrated {self.stats['business_partners']} Business Partners")
+
+    def _build_business_partner_row(self, row):
+        """Map a c_bpartner row to a tuple of BP_INSERT_COLUMNS values"""
+        # Determine partner type based on flags
+        is_customer = (row[5] == 'Y')
+        is_vendor = (row[6] == 'Y')
+
+        if is_customer and is_vendor:
+            partner_type = 'customer'  # Default to customer if both
+        elif is_vendor:
+            partner_type = 'vendor'
+        elif is_customer:
+            partner_type = 'customer'
+        else:
+            partner_type = 'other'  # Neither customer nor vendor
+
+        # Values follow BP_INSERT_COLUMNS; flags mirror BusinessPartner.save()
+        return (
+            uuid.uuid4(),
+            row[8],
+            row[10],
+            self.default_user_id,
+            self.default_user_id,
+            (row[7] == 'Y'),
+            str(row[0]),
+            row[1] or f"BP{row[0]}",
+            row[2],
+            row[3] or '',
+            partner_type,
+            self.BP_DEFAULT_COUNTRY,
+            '',
+            '',
+            '',
+            '',
+            False,
+            self.BP_DEFAULT_CREDIT_LIMIT_CURRENCY,
+            self.BP_DEFAULT_PAYMENT_TERMS,
+            partner_type in ('customer', 'prospect'),
+            partner_type == 'vendor',
+            partner_type == 'employee',
+            partner_type == 'prospect',
+            False,
+            False,
+        )
+
+    def _insert_business_partners(self, new_cursor, table, rows):
+        """Insert a batch of business partner tuples with a single multi-row INSERT"""
+        try:
+            psycopg2.extras.execute_values(
+                new_cursor,
+                f"INSERT INTO {table} ({', '.join(self.BP_INSERT_COLUMNS)}) VALUES %s",
+                rows,
+                page_size=self.BP_BATCH_SIZE
+            )
+            self.new_db.commit()
+            return len(rows)
+
+        except Exception as e:
+            self.new_db.rollback()
+            error_msg = f"Error migrating batch of {len(rows)} Business Partners starting at ID {rows[0][6]}: {str(e)}"
+            print(error_msg)
+            self.stats['errors'].append(error_msg)
+            return 0
+
+    def _create_staging_table(self, new_cursor, table):
+        """Create an UNLOGGED copy of a table so bulk writes skip the WAL"""
+        staging_table = f"staging_{table}"
+        new_cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+        new_cursor.execute(f"CREATE UNLOGGED TABLE {staging_table} (LIKE {table} INCLUDING DEFAULTS)")
+        self.new_db.commit()
+        return staging_table
+
+    def _publish_staging_table(self, new_cursor, staging_table, table):
+        """Move staged rows into the real table in one statement and drop the staging table"""
+        new_cursor.execute(f"INSERT INTO {table} SELECT * FROM {staging_table} ON CONFLICT DO NOTHING")
+        inserted = new_cursor.rowcount
+        new_cursor.execute(f"DROP TABLE {staging_table}")
+        self.new_db.commit()
+        return inserted
     
+    @transaction.atomic
     def migrate_sales_orders(self):
         """Migrate sales orders from c_order where issotrx='Y'"""
         print("Migrating Sales Orders...")
         
-        old_cursor = self.old_db.cursor()
-        
         # Get sales orders from old system
-        old_cursor.execute("""
+        query = """
             SELECT 
                 o.c_order_id,
                 o.documentno,
@@ -164,67 +299,187 @@ class iDempiereDataMigrator:
                 o.isactive
             FROM adempiere.c_order o
             WHERE o.issotrx = 'Y'
+              AND NOT (o.c_order_id = ANY(%s))
             ORDER BY o.c_order_id
+        """
+
+        invalid_ids = self._find_invalid_rows('Sales Order', """
+            SELECT
+                o.c_order_id,
+                CASE
+                    WHEN o.documentno IS NULL THEN 'missing document number'
+                    WHEN o.dateordered IS NULL THEN 'missing order date'
+                    ELSE 'unknown business partner ' || o.c_bpartner_id
+                END
+            FROM adempiere.c_order o
+            LEFT JOIN adempiere.c_bpartner bp ON bp.c_bpartner_id = o.c_bpartner_id
+            WHERE o.issotrx = 'Y'
+              AND (o.documentno IS NULL OR o.dateordered IS NULL OR bp.c_bpartner_id IS NULL)
         """)
-        
-        for row in old_cursor.fetchall():
-            try:
+
+        for batch in _chunked(self._stream_rows(query, (invalid_ids,)), self.LINE_BATCH_SIZE):
+            order_ids_batch = []
+            for row in batch:
                 # Find corresponding business partner
-                bp = BusinessPartner.objects.filter(legacy_id=str(row[6])).first()
-                if not bp:
+                bp_id = self.business_partner_map.get(str(row[6]))
+                if not bp_id:
                     print(f"Warning: Business Partner ID {row[6]} not found for Sales Order {row[0]}")
                     continue
                 
-                # Map document status
-                doc_status_map = {
-                    'DR': 'drafted',
-                    'IP': 'in_progress', 
-                    'WP': 'waiting_payment',
-                    'CO': 'complete',
-                    'CL': 'closed',
-                    'RE': 'reversed',
-                    'VO': 'voided'
-                }
-                
-                so = SalesOrder.objects.create(
-                    organization=self.default_org,
+                order_ids_batch.append((row[0], SalesOrder(
+                    organization_id=self.default_org_id,
                     document_no=row[1],
                     description=row[2] or '',
-                    doc_status=doc_status_map.get(row[3], 'drafted'),
+                    doc_status=SALES_ORDER_DOC_STATUS_MAP.get(row[3], 'drafted'),
                     date_ordered=row[4],
                     date_promised=row[5],
-                    business_partner=bp,
-                    currency=self.default_currency,
-                    price_list=PriceList.objects.filter(is_sales_price_list=True).first(),
-                    warehouse=Warehouse.objects.first(),
-                    grand_total=Decimal(str(row[7])) if row[7] else Decimal('0.00'),
+                    business_partner_id=bp_id,
+                    currency_id=self.default_currency_id,
+                    price_list_id=self.sales_price_list_id,
+                    warehouse_id=self.default_warehouse_id,
+                    grand_total=row[7] or Decimal('0.00'),
                     created=row[8],
-                    created_by=self.default_user,
+                    created_by_id=self.default_user_id,
                     updated=row[9],
-                    updated_by=self.default_user,
+                    updated_by_id=self.default_user_id,
                     is_active=(row[10] == 'Y'),
                     legacy_id=str(row[0])
-                )
-                
-                # Migrate order lines
-                self.migrate_sales_order_lines(row[0], so)
-                
-                self.stats['sales_orders'] += 1
-                
+                )))
+
+            SalesOrder.objects.bulk_create([order for _, order in order_ids_batch])
+            self.migrate_sales_order_lines(order_ids_batch)
+            self.stats['sales_orders'] += len(order_ids_batch)
+
+        self._update_order_totals(SalesOrder, SalesOrderLine)
+        print(f"Migrated {self.stats['sales_orders']} Sales Orders")
+
+    def _stream_rows(self, query, params=None):
+        """Yield source rows while a background thread fetches the next chunks.
+
+        The reader uses its own connection and a server-side cursor, so the
+        next chunk is read from iDempiere while the current one is written.
+        The bounded queue keeps at most STREAM_QUEUE_CHUNKS chunks in memory.
+        """
+        chunks = queue.Queue(maxsize=self.STREAM_QUEUE_CHUNKS)
+        # Set when the consumer stops early, so the reader doesn't block on a full queue
+        stop = threading.Event()
+
+        def put(item):
+            """Queue an item, giving up once the consumer has stopped"""
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=self.STREAM_PUT_TIMEOUT)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            reader_db = None
+            try:
+                reader_db = psycopg2.connect(**self.OLD_DB_SETTINGS)
+                reader_cursor = reader_db.cursor(name='migration_stream')
+                reader_cursor.execute(query, params)
+                while True:
+                    rows = reader_cursor.fetchmany(self.STREAM_CHUNK_SIZE)
+                    if not put(rows) or not rows:
+                        break
+                reader_cursor.close()
             except Exception as e:
-                error_msg = f"Error migrating Sales Order ID {row[0]}: {str(e)}"
-                print(error_msg)
-                self.stats['errors'].append(error_msg)
-        
+                put(e)
+            finally:
+                if reader_db is not None:
+                    reader_db.close()
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+
+        try:
+            while True:
+                rows = chunks.get()
+                if isinstance(rows, Exception):
+                    raise rows
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            # Runs on exhaustion, errors and generator close alike: release the
+            # reader from any pending put, then wait for it to close its connection
+            stop.set()
+            while True:
+                try:
+                    chunks.get_nowait()
+                except queue.Empty:
+                    break
+            producer.join()
+
+    def _find_invalid_rows(self, entity, query):
+        """Run a validation query returning (id, reason) rows, report them and return the IDs"""
+        old_cursor = self.old_db.cursor()
+        old_cursor.execute(query)
+        invalid_rows = old_cursor.fetchall()
         old_cursor.close()
-        print(f"Migrated {self.stats['sales_orders']} Sales Orders")
-    
-    def migrate_sales_order_lines(self, old_order_id, new_order):
-        """Migrate sales order lines"""
+
+        for source_id, reason in invalid_rows:
+            error_msg = f"Skipping {entity} ID {source_id}: {reason}"
+            print(error_msg)
+            self.stats['errors'].append(error_msg)
+
+        return [source_id for source_id, _ in invalid_rows]
+
+    @transaction.atomic
+    def _prepopulate_products(self):
+        """Bulk-create placeholder products for every legacy product referenced by a line"""
+        print("Creating placeholder Products...")
+
         old_cursor = self.old_db.cursor()
-        
         old_cursor.execute("""
-            SELECT 
+            SELECT m_product_id FROM adempiere.c_orderline WHERE m_product_id IS NOT NULL
+            UNION
+            SELECT m_product_id FROM adempiere.c_invoiceline WHERE m_product_id IS NOT NULL
+            UNION
+            SELECT m_product_id FROM adempiere.m_inoutline WHERE m_product_id IS NOT NULL
+        """)
+        missing_ids = {str(product_id) for (product_id,) in old_cursor.fetchall()} - self.product_map.keys()
+        old_cursor.close()
+
+        placeholders = [
+            Product(
+                name=f"Migrated Product {product_id}",
+                uom_id=self.default_uom_id,
+                created_by_id=self.default_user_id,
+                updated_by_id=self.default_user_id,
+                legacy_id=product_id
+            )
+            for product_id in missing_ids
+        ]
+        Product.objects.bulk_create(placeholders, batch_size=1000)
+        self.product_map.update((product.legacy_id, product.id) for product in placeholders)
+
+        print(f"Created {len(placeholders)} placeholder Products")
+
+    def _fetch_lines_by_parent(self, query, parent_ids):
+        """Run a line query for a batch of parent IDs and group the rows by parent ID"""
+        if not parent_ids:
+            return {}
+
+        old_cursor = self.old_db.cursor()
+        old_cursor.execute(query, (parent_ids,))
+
+        # Rows are ordered by parent ID, so groupby yields one group per parent
+        lines_by_parent = {
+            parent_id: list(rows)
+            for parent_id, rows in groupby(old_cursor.fetchall(), key=itemgetter(0))
+        }
+
+        old_cursor.close()
+        return lines_by_parent
+
+    def migrate_sales_order_lines(self, order_batch):
+        """Migrate sales order lines for a batch of (old_order_id, new_order) pairs"""
+        lines_by_order = self._fetch_lines_by_parent("""
+            SELECT
+                c_order_id,
                 c_orderline_id,
                 line,
                 m_product_id,
@@ -232,54 +487,41 @@ class iDempiereDataMigrator:
                 priceentered,
                 linenetamt,
                 description
-            FROM adempiere.c_orderline 
-            WHERE c_order_id = %s
-            ORDER BY line
-        """, (old_order_id,))
-        
-        for row in old_cursor.fetchall():
-            try:
-                # Find or create product
-                product = Product.objects.filter(legacy_id=str(row[2])).first()
-                if not product:
-                    # Create placeholder product
-                    product = Product.objects.create(
-                        code=f"PROD{row[2]}",
-                        name=f"Migrated Product {row[2]}",
-                        product_category=ProductCategory.objects.first(),
-                        uom=UnitOfMeasure.objects.first(),
-                        created_by=self.default_user,
-                        updated_by=self.default_user,
-                        legacy_id=str(row[2])
-                    )
-                
-                SalesOrderLine.objects.create(
+            FROM adempiere.c_orderline
+            WHERE c_order_id = ANY(%s)
+            ORDER BY c_order_id, line
+        """, [old_order_id for old_order_id, _ in order_batch])
+
+        # COPY bypasses SalesOrderLine.save(), so its price defaults are applied
+        # here and the order totals are recalculated once in _update_order_totals()
+        lines = []
+        for old_order_id, new_order in order_batch:
+            for row in lines_by_order.get(old_order_id, []):
+                price_entered = row[5] or _ZERO
+                lines.append(SalesOrderLine(
                     order=new_order,
-                    line_no=row[1],
-                    product=product,
-                    quantity_ordered=Decimal(str(row[3])),
-                    price_entered=Decimal(str(row[4])),
-                    line_net_amount=Decimal(str(row[5])),
-                    price_actual=Decimal(str(row[4])),
-                    description=row[6] or '',
-                    created_by=self.default_user,
-                    updated_by=self.default_user,
-                    legacy_id=str(row[0])
-                )
-                
-            except Exception as e:
-                print(f"Error migrating Sales Order Line ID {row[0]}: {str(e)}")
-        
-        old_cursor.close()
+                    line_no=row[2],
+                    product_id=self.product_map.get(str(row[3])),
+                    quantity_ordered=row[4] or _ZERO,
+                    price_entered=price_entered,
+                    line_net_amount=row[6] or _ZERO,
+                    price_actual=price_entered,
+                    price_list=price_entered,
+                    description=row[7] or '',
+                    created_by_id=self.default_user_id,
+                    updated_by_id=self.default_user_id,
+                    legacy_id=str(row[1])
+                ))
+
+        self._copy_lines(SalesOrderLine, lines)
     
+    @transaction.atomic
     def migrate_purchase_orders(self):
         """Migrate purchase orders from c_order where issotrx='N'"""
         print("Migrating Purchase Orders...")
         
-        old_cursor = self.old_db.cursor()
-        
         # Similar to sales orders but for purchase orders
-        old_cursor.execute("""
+        query = """
             SELECT 
                 o.c_order_id,
                 o.documentno,
@@ -296,66 +538,65 @@ class iDempiereDataMigrator:
                 o.isactive
             FROM adempiere.c_order o
             WHERE o.issotrx = 'N'
+              AND NOT (o.c_order_id = ANY(%s))
             ORDER BY o.c_order_id
+        """
+
+        invalid_ids = self._find_invalid_rows('Purchase Order', """
+            SELECT
+                o.c_order_id,
+                CASE
+                    WHEN o.documentno IS NULL THEN 'missing document number'
+                    WHEN o.dateordered IS NULL THEN 'missing order date'
+                    ELSE 'unknown business partner ' || o.c_bpartner_id
+                END
+            FROM adempiere.c_order o
+            LEFT JOIN adempiere.c_bpartner bp ON bp.c_bpartner_id = o.c_bpartner_id
+            WHERE o.issotrx = 'N'
+              AND (o.documentno IS NULL OR o.dateordered IS NULL OR bp.c_bpartner_id IS NULL)
         """)
-        
-        for row in old_cursor.fetchall():
-            try:
+
+        for batch in _chunked(self._stream_rows(query, (invalid_ids,)), self.LINE_BATCH_SIZE):
+            order_ids_batch = []
+            for row in batch:
                 # Find corresponding business partner
-                bp = BusinessPartner.objects.filter(legacy_id=str(row[6])).first()
-                if not bp:
+                bp_id = self.business_partner_map.get(str(row[6]))
+                if not bp_id:
                     print(f"Warning: Business Partner ID {row[6]} not found for Purchase Order {row[0]}")
                     continue
                 
-                # Map document status
-                doc_status_map = {
-                    'DR': 'drafted',
-                    'IP': 'in_progress', 
-                    'CO': 'complete',
-                    'CL': 'closed',
-                    'RE': 'reversed',
-                    'VO': 'voided'
-                }
-                
-                po = PurchaseOrder.objects.create(
-                    organization=self.default_org,
+                order_ids_batch.append((row[0], PurchaseOrder(
+                    organization_id=self.default_org_id,
                     document_no=row[1],
                     description=row[2] or '',
-                    doc_status=doc_status_map.get(row[3], 'drafted'),
+                    doc_status=DOC_STATUS_MAP.get(row[3], 'drafted'),
                     date_ordered=row[4],
                     date_promised=row[5],
-                    business_partner=bp,
-                    currency=self.default_currency,
-                    price_list=PriceList.objects.filter(is_purchase_price_list=True).first(),
-                    warehouse=Warehouse.objects.first(),
-                    grand_total=Decimal(str(row[7])) if row[7] else Decimal('0.00'),
+                    business_partner_id=bp_id,
+                    currency_id=self.default_currency_id,
+                    price_list_id=self.purchase_price_list_id,
+                    warehouse_id=self.default_warehouse_id,
+                    grand_total=row[7] or Decimal('0.00'),
                     created=row[8],
-                    created_by=self.default_user,
+                    created_by_id=self.default_user_id,
                     updated=row[9],
-                    updated_by=self.default_user,
+                    updated_by_id=self.default_user_id,
                     is_active=(row[10] == 'Y'),
                     legacy_id=str(row[0])
-                )
-                
-                # Migrate order lines
-                self.migrate_purchase_order_lines(row[0], po)
-                
-                self.stats['purchase_orders'] += 1
-                
-            except Exception as e:
-                error_msg = f"Error migrating Purchase Order ID {row[0]}: {str(e)}"
-                print(error_msg)
-                self.stats['errors'].append(error_msg)
-        
-        old_cursor.close()
+                )))
+
+            PurchaseOrder.objects.bulk_create([order for _, order in order_ids_batch])
+            self.migrate_purchase_order_lines(order_ids_batch)
+            self.stats['purchase_orders'] += len(order_ids_batch)
+
+        self._update_order_totals(PurchaseOrder, PurchaseOrderLine)
         print(f"Migrated {self.stats['purchase_orders']} Purchase Orders")
     
-    def migrate_purchase_order_lines(self, old_order_id, new_order):
-        """Migrate purchase order lines"""
-        old_cursor = self.old_db.cursor()
-        
-        old_cursor.execute("""
-            SELECT 
+    def migrate_purchase_order_lines(self, order_batch):
+        """Migrate purchase order lines for a batch of (old_order_id, new_order) pairs"""
+        lines_by_order = self._fetch_lines_by_parent("""
+            SELECT
+                c_order_id,
                 c_orderline_id,
                 line,
                 m_product_id,
@@ -363,53 +604,41 @@ class iDempiereDataMigrator:
                 priceentered,
                 linenetamt,
                 description
-            FROM adempiere.c_orderline 
-            WHERE c_order_id = %s
-            ORDER BY line
-        """, (old_order_id,))
-        
-        for row in old_cursor.fetchall():
-            try:
-                # Find or create product
-                product = Product.objects.filter(legacy_id=str(row[2])).first()
-                if not product:
-                    # Create placeholder product
-                    product = Product.objects.create(
-                        code=f"PROD{row[2]}",
-                        name=f"Migrated Product {row[2]}",
-                        product_category=ProductCategory.objects.first(),
-                        uom=UnitOfMeasure.objects.first(),
-                        created_by=self.default_user,
-                        updated_by=self.default_user,
-                        legacy_id=str(row[2])
-                    )
-                
-                PurchaseOrderLine.objects.create(
+            FROM adempiere.c_orderline
+            WHERE c_order_id = ANY(%s)
+            ORDER BY c_order_id, line
+        """, [old_order_id for old_order_id, _ in order_batch])
+
+        # COPY bypasses PurchaseOrderLine.save(), so its line_net_amount rule is
+        # applied here and the order totals are recalculated once in
+        # _update_order_totals(). save() never set price_list, so it keeps its default.
+        lines = []
+        for old_order_id, new_order in order_batch:
+            for row in lines_by_order.get(old_order_id, []):
+                quantity_ordered = row[4] or _ZERO
+                price_entered = row[5] or _ZERO
+                lines.append(PurchaseOrderLine(
                     order=new_order,
-                    line_no=row[1],
-                    product=product,
-                    quantity_ordered=Decimal(str(row[3])),
-                    price_entered=Decimal(str(row[4])),
-                    line_net_amount=Decimal(str(row[5])),
-                    price_actual=Decimal(str(row[4])),
-                    description=row[6] or '',
-                    created_by=self.default_user,
-                    updated_by=self.default_user,
-                    legacy_id=str(row[0])
-                )
-                
-            except Exception as e:
-                print(f"Error migrating Purchase Order Line ID {row[0]}: {str(e)}")
-        
-        old_cursor.close()
+                    line_no=row[2],
+                    product_id=self.product_map.get(str(row[3])),
+                    quantity_ordered=quantity_ordered,
+                    price_entered=price_entered,
+                    line_net_amount=quantity_ordered * price_entered if row[4] and row[5] else (row[6] or _ZERO),
+                    price_actual=price_entered,
+                    description=row[7] or '',
+                    created_by_id=self.default_user_id,
+                    updated_by_id=self.default_user_id,
+                    legacy_id=str(row[1])
+                ))
+
+        self._copy_lines(PurchaseOrderLine, lines)
     
+    @transaction.atomic
     def migrate_invoices(self):
         """Migrate invoices from c_invoice"""
         print("Migrating Invoices...")
         
-        old_cursor = self.old_db.cursor()
-        
-        old_cursor.execute("""
+        query = """
             SELECT 
                 c_invoice_id,
                 documentno,
@@ -425,91 +654,88 @@ class iDempiereDataMigrator:
                 updatedby,
                 isactive
             FROM adempiere.c_invoice
+            WHERE NOT (c_invoice_id = ANY(%s))
             ORDER BY c_invoice_id
+        """
+
+        invalid_ids = self._find_invalid_rows('Invoice', """
+            SELECT
+                i.c_invoice_id,
+                CASE
+                    WHEN i.documentno IS NULL THEN 'missing document number'
+                    WHEN i.dateinvoiced IS NULL THEN 'missing invoice date'
+                    ELSE 'unknown business partner ' || i.c_bpartner_id
+                END
+            FROM adempiere.c_invoice i
+            LEFT JOIN adempiere.c_bpartner bp ON bp.c_bpartner_id = i.c_bpartner_id
+            WHERE i.documentno IS NULL OR i.dateinvoiced IS NULL OR bp.c_bpartner_id IS NULL
         """)
-        
-        for row in old_cursor.fetchall():
-            try:
+
+        for batch in _chunked(self._stream_rows(query, (invalid_ids,)), self.LINE_BATCH_SIZE):
+            invoice_ids_batch = []
+            bill_ids_batch = []
+            for row in batch:
                 # Find corresponding business partner
-                bp = BusinessPartner.objects.filter(legacy_id=str(row[5])).first()
-                if not bp:
+                bp_id = self.business_partner_map.get(str(row[5]))
+                if not bp_id:
                     print(f"Warning: Business Partner ID {row[5]} not found for Invoice {row[0]}")
                     continue
                 
-                # Map document status
-                doc_status_map = {
-                    'DR': 'drafted',
-                    'IP': 'in_progress', 
-                    'CO': 'complete',
-                    'CL': 'closed',
-                    'RE': 'reversed',
-                    'VO': 'voided'
-                }
-                
                 if row[7] == 'Y':  # Sales invoice
-                    invoice = Invoice.objects.create(
-                        organization=self.default_org,
+                    invoice_ids_batch.append((row[0], Invoice(
+                        organization_id=self.default_org_id,
                         document_no=row[1],
                         description=row[2] or '',
-                        doc_status=doc_status_map.get(row[3], 'drafted'),
+                        doc_status=DOC_STATUS_MAP.get(row[3], 'drafted'),
                         date_invoiced=row[4],
                         date_accounting=row[4],  # Use invoice date as accounting date
                         due_date=row[4],  # Set due date to invoice date for now
-                        business_partner=bp,
-                        currency=self.default_currency,
-                        price_list=PriceList.objects.filter(is_sales_price_list=True).first(),
-                        grand_total=Decimal(str(row[6])) if row[6] else Decimal('0.00'),
+                        business_partner_id=bp_id,
+                        currency_id=self.default_currency_id,
+                        price_list_id=self.sales_price_list_id,
+                        grand_total=row[6] or Decimal('0.00'),
                         created=row[8],
-                        created_by=self.default_user,
+                        created_by_id=self.default_user_id,
                         updated=row[9],
-                        updated_by=self.default_user,
+                        updated_by_id=self.default_user_id,
                         is_active=(row[10] == 'Y'),
                         legacy_id=str(row[0])
-                    )
-                    
-                    # Migrate invoice lines
-                    self.migrate_invoice_lines(row[0], invoice)
-                    
+                    )))
+            
                 else:  # Purchase invoice (Vendor Bill)
-                    bill = VendorBill.objects.create(
-                        organization=self.default_org,
+                    bill_ids_batch.append((row[0], VendorBill(
+                        organization_id=self.default_org_id,
                         document_no=row[1],
                         description=row[2] or '',
-                        doc_status=doc_status_map.get(row[3], 'drafted'),
+                        doc_status=DOC_STATUS_MAP.get(row[3], 'drafted'),
                         date_invoiced=row[4],
                         date_accounting=row[4],  # Use invoice date as accounting date
                         due_date=row[4],  # Set due date to invoice date for now
-                        business_partner=bp,
-                        currency=self.default_currency,
-                        price_list=PriceList.objects.filter(is_purchase_price_list=True).first(),
-                        grand_total=Decimal(str(row[6])) if row[6] else Decimal('0.00'),
+                        business_partner_id=bp_id,
+                        currency_id=self.default_currency_id,
+                        price_list_id=self.purchase_price_list_id,
+                        grand_total=row[6] or Decimal('0.00'),
                         created=row[8],
-                        created_by=self.default_user,
+                        created_by_id=self.default_user_id,
                         updated=row[9],
-                        updated_by=self.default_user,
+                        updated_by_id=self.default_user_id,
                         is_active=(row[10] == 'Y'),
                         legacy_id=str(row[0])
-                    )
-                    
-                    # Migrate bill lines
-                    self.migrate_vendor_bill_lines(row[0], bill)
-                
-                self.stats['invoices'] += 1
-                
-            except Exception as e:
-                error_msg = f"Error migrating Invoice ID {row[0]}: {str(e)}"
-                print(error_msg)
-                self.stats['errors'].append(error_msg)
-        
-        old_cursor.close()
+                    )))
+
+            Invoice.objects.bulk_create([document for _, document in invoice_ids_batch])
+            VendorBill.objects.bulk_create([document for _, document in bill_ids_batch])
+            self.migrate_invoice_lines(invoice_ids_batch)
+            self.migrate_vendor_bill_lines(bill_ids_batch)
+            self.stats['invoices'] += len(invoice_ids_batch) + len(bill_ids_batch)
+
         print(f"Migrated {self.stats['invoices']} Invoices")
     
-    def migrate_invoice_lines(self, old_invoice_id, new_invoice):
-        """Migrate invoice lines"""
-        old_cursor = self.old_db.cursor()
-        
-        old_cursor.execute("""
-            SELECT 
+    def migrate_invoice_lines(self, invoice_batch):
+        """Migrate invoice lines for a batch of (old_invoice_id, new_invoice) pairs"""
+        lines_by_invoice = self._fetch_lines_by_parent("""
+            SELECT
+                c_invoice_id,
                 c_invoiceline_id,
                 line,
                 m_product_id,
@@ -517,52 +743,35 @@ class iDempiereDataMigrator:
                 priceentered,
                 linenetamt,
                 description
-            FROM adempiere.c_invoiceline 
-            WHERE c_invoice_id = %s
-            ORDER BY line
-        """, (old_invoice_id,))
-        
-        for row in old_cursor.fetchall():
-            try:
-                # Find or create product
-                product = Product.objects.filter(legacy_id=str(row[2])).first()
-                if not product:
-                    # Create placeholder product
-                    product = Product.objects.create(
-                        code=f"PROD{row[2]}",
-                        name=f"Migrated Product {row[2]}",
-                        product_category=ProductCategory.objects.first(),
-                        uom=UnitOfMeasure.objects.first(),
-                        created_by=self.default_user,
-                        updated_by=self.default_user,
-                        legacy_id=str(row[2])
-                    )
-                
-                InvoiceLine.objects.create(
+            FROM adempiere.c_invoiceline
+            WHERE c_invoice_id = ANY(%s)
+            ORDER BY c_invoice_id, line
+        """, [old_invoice_id for old_invoice_id, _ in invoice_batch])
+
+        lines = []
+        for old_invoice_id, new_invoice in invoice_batch:
+            for row in lines_by_invoice.get(old_invoice_id, []):
+                lines.append(InvoiceLine(
                     invoice=new_invoice,
-                    line_no=row[1],
-                    product=product,
-                    quantity_invoiced=Decimal(str(row[3])),
-                    price_entered=Decimal(str(row[4])),
-                    line_net_amount=Decimal(str(row[5])),
-                    price_actual=Decimal(str(row[4])),
-                    description=row[6] or '',
-                    created_by=self.default_user,
-                    updated_by=self.default_user,
-                    legacy_id=str(row[0])
-                )
-                
-            except Exception as e:
-                print(f"Error migrating Invoice Line ID {row[0]}: {str(e)}")
-        
-        old_cursor.close()
+                    line_no=row[2],
+                    product_id=self.product_map.get(str(row[3])),
+                    quantity_invoiced=row[4] or _ZERO,
+                    price_entered=row[5] or _ZERO,
+                    line_net_amount=row[6] or _ZERO,
+                    price_actual=row[5] or _ZERO,
+                    description=row[7] or '',
+                    created_by_id=self.default_user_id,
+                    updated_by_id=self.default_user_id,
+                    legacy_id=str(row[1])
+                ))
+
+        self._copy_lines(InvoiceLine, lines)
     
-    def migrate_vendor_bill_lines(self, old_invoice_id, new_bill):
-        """Migrate vendor bill lines"""
-        old_cursor = self.old_db.cursor()
-        
-        old_cursor.execute("""
-            SELECT 
+    def migrate_vendor_bill_lines(self, bill_batch):
+        """Migrate vendor bill lines for a batch of (old_invoice_id, new_bill) pairs"""
+        lines_by_bill = self._fetch_lines_by_parent("""
+            SELECT
+                c_invoice_id,
                 c_invoiceline_id,
                 line,
                 m_product_id,
@@ -570,53 +779,36 @@ class iDempiereDataMigrator:
                 priceentered,
                 linenetamt,
                 description
-            FROM adempiere.c_invoiceline 
-            WHERE c_invoice_id = %s
-            ORDER BY line
-        """, (old_invoice_id,))
-        
-        for row in old_cursor.fetchall():
-            try:
-                # Find or create product
-                product = Product.objects.filter(legacy_id=str(row[2])).first()
-                if not product:
-                    # Create placeholder product
-                    product = Product.objects.create(
-                        code=f"PROD{row[2]}",
-                        name=f"Migrated Product {row[2]}",
-                        product_category=ProductCategory.objects.first(),
-                        uom=UnitOfMeasure.objects.first(),
-                        created_by=self.default_user,
-                        updated_by=self.default_user,
-                        legacy_id=str(row[2])
-                    )
-                
-                VendorBillLine.objects.create(
+            FROM adempiere.c_invoiceline
+            WHERE c_invoice_id = ANY(%s)
+            ORDER BY c_invoice_id, line
+        """, [old_bill_id for old_bill_id, _ in bill_batch])
+
+        lines = []
+        for old_bill_id, new_bill in bill_batch:
+            for row in lines_by_bill.get(old_bill_id, []):
+                lines.append(VendorBillLine(
                     invoice=new_bill,
-                    line_no=row[1],
-                    product=product,
-                    quantity_invoiced=Decimal(str(row[3])),
-                    price_entered=Decimal(str(row[4])),
-                    line_net_amount=Decimal(str(row[5])),
-                    price_actual=Decimal(str(row[4])),
-                    description=row[6] or '',
-                    created_by=self.default_user,
-                    updated_by=self.default_user,
-                    legacy_id=str(row[0])
-                )
-                
-            except Exception as e:
-                print(f"Error migrating Vendor Bill Line ID {row[0]}: {str(e)}")
-        
-        old_cursor.close()
+                    line_no=row[2],
+                    product_id=self.product_map.get(str(row[3])),
+                    quantity_invoiced=row[4] or _ZERO,
+                    price_entered=row[5] or _ZERO,
+                    line_net_amount=row[6] or _ZERO,
+                    price_actual=row[5] or _ZERO,
+                    description=row[7] or '',
+                    created_by_id=self.default_user_id,
+                    updated_by_id=self.default_user_id,
+                    legacy_id=str(row[1])
+                ))
+
+        self._copy_lines(VendorBillLine, lines)
     
+    @transaction.atomic
     def migrate_shipments(self):
         """Migrate shipments from m_inout"""
         print("Migrating Shipments...")
         
-        old_cursor = self.old_db.cursor()
-        
-        old_cursor.execute("""
+        query = """
             SELECT 
                 m_inout_id,
                 documentno,
@@ -631,187 +823,218 @@ class iDempiereDataMigrator:
                 updatedby,
                 isactive
             FROM adempiere.m_inout
+            WHERE NOT (m_inout_id = ANY(%s))
             ORDER BY m_inout_id
+        """
+
+        invalid_ids = self._find_invalid_rows('Shipment', """
+            SELECT
+                io.m_inout_id,
+                CASE
+                    WHEN io.documentno IS NULL THEN 'missing document number'
+                    WHEN io.movementdate IS NULL THEN 'missing movement date'
+                    ELSE 'unknown business partner ' || io.c_bpartner_id
+                END
+            FROM adempiere.m_inout io
+            LEFT JOIN adempiere.c_bpartner bp ON bp.c_bpartner_id = io.c_bpartner_id
+            WHERE io.documentno IS NULL OR io.movementdate IS NULL OR bp.c_bpartner_id IS NULL
         """)
-        
-        for row in old_cursor.fetchall():
-            try:
+
+        for batch in _chunked(self._stream_rows(query, (invalid_ids,)), self.LINE_BATCH_SIZE):
+            shipment_ids_batch = []
+            receipt_ids_batch = []
+            for row in batch:
                 # Find corresponding business partner
-                bp = BusinessPartner.objects.filter(legacy_id=str(row[5])).first()
-                if not bp:
+                bp_id = self.business_partner_map.get(str(row[5]))
+                if not bp_id:
                     print(f"Warning: Business Partner ID {row[5]} not found for Shipment {row[0]}")
                     continue
                 
-                # Map document status
-                doc_status_map = {
-                    'DR': 'drafted',
-                    'IP': 'in_progress', 
-                    'CO': 'complete',
-                    'CL': 'closed',
-                    'RE': 'reversed',
-                    'VO': 'voided'
-                }
-                
                 if row[6] == 'Y':  # Customer shipment
-                    shipment = Shipment.objects.create(
-                        organization=self.default_org,
+                    shipment_ids_batch.append((row[0], Shipment(
+                        organization_id=self.default_org_id,
                         document_no=row[1],
                         description=row[2] or '',
-                        doc_status=doc_status_map.get(row[3], 'drafted'),
+                        doc_status=DOC_STATUS_MAP.get(row[3], 'drafted'),
                         movement_date=row[4],
-                        business_partner=bp,
-                        warehouse=Warehouse.objects.first(),
+                        business_partner_id=bp_id,
+                        warehouse_id=self.default_warehouse_id,
                         created=row[7],
-                        created_by=self.default_user,
+                        created_by_id=self.default_user_id,
                         updated=row[8],
-                        updated_by=self.default_user,
+                        updated_by_id=self.default_user_id,
                         is_active=(row[9] == 'Y'),
                         legacy_id=str(row[0])
-                    )
-                    
-                    # Migrate shipment lines
-                    self.migrate_shipment_lines(row[0], shipment)
-                    
+                    )))
+            
                 else:  # Vendor receipt
-                    receipt = Receipt.objects.create(
-                        organization=self.default_org,
+                    receipt_ids_batch.append((row[0], Receipt(
+                        organization_id=self.default_org_id,
                         document_no=row[1],
                         description=row[2] or '',
-                        doc_status=doc_status_map.get(row[3], 'drafted'),
+                        doc_status=DOC_STATUS_MAP.get(row[3], 'drafted'),
                         movement_date=row[4],
-                        business_partner=bp,
-                        warehouse=Warehouse.objects.first(),
+                        business_partner_id=bp_id,
+                        warehouse_id=self.default_warehouse_id,
                         created=row[7],
-                        created_by=self.default_user,
+                        created_by_id=self.default_user_id,
                         updated=row[8],
-                        updated_by=self.default_user,
+                        updated_by_id=self.default_user_id,
                         is_active=(row[9] == 'Y'),
                         legacy_id=str(row[0])
-                    )
-                    
-                    # Migrate receipt lines
-                    self.migrate_receipt_lines(row[0], receipt)
-                
-                self.stats['shipments'] += 1
-                
-            except Exception as e:
-                error_msg = f"Error migrating Shipment ID {row[0]}: {str(e)}"
-                print(error_msg)
-                self.stats['errors'].append(error_msg)
-        
-        old_cursor.close()
+                    )))
+
+            Shipment.objects.bulk_create([document for _, document in shipment_ids_batch])
+            Receipt.objects.bulk_create([document for _, document in receipt_ids_batch])
+            self.migrate_shipment_lines(shipment_ids_batch)
+            self.migrate_receipt_lines(receipt_ids_batch)
+            self.stats['shipments'] += len(shipment_ids_batch) + len(receipt_ids_batch)
+
         print(f"Migrated {self.stats['shipments']} Shipments")
     
-    def migrate_shipment_lines(self, old_inout_id, new_shipment):
-        """Migrate shipment lines"""
-        old_cursor = self.old_db.cursor()
-        
-        old_cursor.execute("""
-            SELECT 
+    def migrate_shipment_lines(self, shipment_batch):
+        """Migrate shipment lines for a batch of (old_inout_id, new_shipment) pairs"""
+        lines_by_shipment = self._fetch_lines_by_parent("""
+            SELECT
+                m_inout_id,
                 m_inoutline_id,
                 line,
                 m_product_id,
                 movementqty,
                 description
-            FROM adempiere.m_inoutline 
-            WHERE m_inout_id = %s
-            ORDER BY line
-        """, (old_inout_id,))
-        
-        for row in old_cursor.fetchall():
-            try:
-                # Find or create product
-                product = Product.objects.filter(legacy_id=str(row[2])).first()
-                if not product:
-                    # Create placeholder product
-                    product = Product.objects.create(
-                        code=f"PROD{row[2]}",
-                        name=f"Migrated Product {row[2]}",
-                        product_category=ProductCategory.objects.first(),
-                        uom=UnitOfMeasure.objects.first(),
-                        created_by=self.default_user,
-                        updated_by=self.default_user,
-                        legacy_id=str(row[2])
-                    )
-                
-                ShipmentLine.objects.create(
+            FROM adempiere.m_inoutline
+            WHERE m_inout_id = ANY(%s)
+            ORDER BY m_inout_id, line
+        """, [old_shipment_id for old_shipment_id, _ in shipment_batch])
+
+        lines = []
+        for old_shipment_id, new_shipment in shipment_batch:
+            for row in lines_by_shipment.get(old_shipment_id, []):
+                lines.append(ShipmentLine(
                     shipment=new_shipment,
-                    line_no=row[1],
-                    product=product,
-                    movement_quantity=Decimal(str(row[3])),
-                    quantity_entered=Decimal(str(row[3])),
-                    description=row[4] or '',
-                    created_by=self.default_user,
-                    updated_by=self.default_user,
-                    legacy_id=str(row[0])
-                )
-                
-            except Exception as e:
-                print(f"Error migrating Shipment Line ID {row[0]}: {str(e)}")
-        
-        old_cursor.close()
+                    line_no=row[2],
+                    product_id=self.product_map.get(str(row[3])),
+                    movement_quantity=row[4] or _ZERO,
+                    quantity_entered=row[4] or _ZERO,
+                    description=row[5] or '',
+                    created_by_id=self.default_user_id,
+                    updated_by_id=self.default_user_id,
+                    legacy_id=str(row[1])
+                ))
+
+        self._copy_lines(ShipmentLine, lines)
     
-    def migrate_receipt_lines(self, old_inout_id, new_receipt):
-        """Migrate receipt lines"""
-        old_cursor = self.old_db.cursor()
-        
-        old_cursor.execute("""
-            SELECT 
+    def migrate_receipt_lines(self, receipt_batch):
+        """Migrate receipt lines for a batch of (old_inout_id, new_receipt) pairs"""
+        lines_by_receipt = self._fetch_lines_by_parent("""
+            SELECT
+                m_inout_id,
                 m_inoutline_id,
                 line,
                 m_product_id,
                 movementqty,
                 description
-            FROM adempiere.m_inoutline 
-            WHERE m_inout_id = %s
-            ORDER BY line
-        """, (old_inout_id,))
-        
-        for row in old_cursor.fetchall():
-            try:
-                # Find or create product
-                product = Product.objects.filter(legacy_id=str(row[2])).first()
-                if not product:
-                    # Create placeholder product
-                    product = Product.objects.create(
-                        code=f"PROD{row[2]}",
-                        name=f"Migrated Product {row[2]}",
-                        product_category=ProductCategory.objects.first(),
-                        uom=UnitOfMeasure.objects.first(),
-                        created_by=self.default_user,
-                        updated_by=self.default_user,
-                        legacy_id=str(row[2])
-                    )
-                
-                ReceiptLine.objects.create(
+            FROM adempiere.m_inoutline
+            WHERE m_inout_id = ANY(%s)
+            ORDER BY m_inout_id, line
+        """, [old_receipt_id for old_receipt_id, _ in receipt_batch])
+
+        lines = []
+        for old_receipt_id, new_receipt in receipt_batch:
+            for row in lines_by_receipt.get(old_receipt_id, []):
+                lines.append(ReceiptLine(
                     receipt=new_receipt,
-                    line_no=row[1],
-                    product=product,
-                    movement_quantity=Decimal(str(row[3])),
-                    quantity_entered=Decimal(str(row[3])),
-                    description=row[4] or '',
-                    created_by=self.default_user,
-                    updated_by=self.default_user,
-                    legacy_id=str(row[0])
-                )
-                
-            except Exception as e:
-                print(f"Error migrating Receipt Line ID {row[0]}: {str(e)}")
-        
-        old_cursor.close()
+                    line_no=row[2],
+                    product_id=self.product_map.get(str(row[3])),
+                    movement_quantity=row[4] or _ZERO,
+                    quantity_entered=row[4] or _ZERO,
+                    description=row[5] or '',
+                    created_by_id=self.default_user_id,
+                    updated_by_id=self.default_user_id,
+                    legacy_id=str(row[1])
+                ))
+
+        self._copy_lines(ReceiptLine, lines)
     
+    def _copy_lines(self, model, lines):
+        """COPY line instances into their table, splitting a failing batch to isolate bad lines.
+
+        _find_invalid_rows only validates the document headers, so a line
+        that still fails its insert is reported and skipped instead of
+        aborting the surrounding migrate_* transaction.
+        """
+        if not lines:
+            return 0
+
+        try:
+            with transaction.atomic():
+                copy_instances(model, lines)
+            return len(lines)
+
+        except Exception as e:
+            if len(lines) == 1:
+                error_msg = f"Error migrating {model._meta.verbose_name} ID {lines[0].legacy_id}: {str(e)}"
+                print(error_msg)
+                self.stats['errors'].append(error_msg)
+                return 0
+
+            middle = len(lines) // 2
+            return self._copy_lines(model, lines[:middle]) + self._copy_lines(model, lines[middle:])
+
+    def _update_order_totals(self, order_model, line_model):
+        """Recalculate totals of migrated orders that have lines with one aggregate UPDATE"""
+        # Same result as calculate_totals() (no tax yet), which the line
+        # models' save() would otherwise run for every line
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE {order_model._meta.db_table} o
+                SET total_lines = s.total,
+                    grand_total = s.total
+                FROM (
+                    SELECT order_id, SUM(line_net_amount) AS total
+                    FROM {line_model._meta.db_table}
+                    GROUP BY order_id
+                ) s
+                WHERE s.order_id = o.id
+                  AND o.legacy_id IS NOT NULL
+            """)
+
+    def _configure_session(self):
+        """Tune the migration session for bulk loading"""
+        with connection.cursor() as cursor:
+            # Migration data can be reloaded, so don't wait for WAL flush on commit
+            cursor.execute("SET synchronous_commit = OFF")
+            # Speeds up index rebuilds and FK validation after the load
+            cursor.execute("SET maintenance_work_mem = '2GB'")
+
     def run_migration(self):
         """Run the complete migration process"""
         print("Starting iDempiere to Modern ERP Migration...")
         print("=" * 60)
         
         try:
+            self._configure_session()
+
             # Run migrations in dependency order
             self.migrate_business_partners()
-            self.migrate_sales_orders()
-            self.migrate_purchase_orders()
-            self.migrate_invoices()
-            self.migrate_shipments()
+            self._load_business_partner_map()
+            self._prepopulate_products()
+
+            # Load lines without incremental index and FK maintenance
+            disabled = {}
+            try:
+                for model in _LINE_MODELS:
+                    table = model._meta.db_table
+                    disabled[table] = disable_indexes(table)
+
+                self.migrate_sales_orders()
+                self.migrate_purchase_orders()
+                self.migrate_invoices()
+                self.migrate_shipments()
+            finally:
+                print("Rebuilding line table indexes and foreign keys...")
+                for table, (indexes, foreign_keys) in disabled.items():
+                    enable_indexes(table, indexes, foreign_keys)
             
             # Print summary
             print("\n" + "=" * 60)
@@ -9,15 +9,84 @@ import os
 import sys
 import django
 import psycopg2
-from decimal import Decimal
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'modern_erp.settings')
 django.setup()
 
+from django.db import transaction
 from core.models import User, UnitOfMeasure
-from sales.models import Invoice, InvoiceLine
-from inventory.models import Product, ProductCategory
+from sales.models import SalesOrderLine, Invoice, InvoiceLine
+from inventory.models import Product
+
+from _utils import ZERO, to_decimal
+
+# Invoice lines are written with multi-row INSERTs of this many rows; ~20 columns
+# per line keeps the default well under Postgres' 65535 bind-parameter limit
+LINE_BATCH_SIZE = int(os.environ.get('MIGRATE_LINE_BATCH', 2000))
+
+# Placeholder products are created in multi-row INSERTs of this many rows
+PRODUCT_BATCH_SIZE = 500
+
+
+def bulk_create_lines(lines, stats):
+    """Insert invoice lines in batches, splitting a failing batch to isolate bad lines"""
+    if not lines:
+        return 0
+    
+    try:
+        with transaction.atomic():
+            InvoiceLine.objects.bulk_create(lines, batch_size=LINE_BATCH_SIZE)
+        return len(lines)
+    
+    except Exception as e:
+        if len(lines) == 1:
+            error_msg = f"Error migrating Invoice Line ID {lines[0].legacy_id}: {str(e)}"
+            print(f"    ✗ {error_msg}")
+            stats['errors'].append(error_msg)
+            return 0
+        
+        middle = len(lines) // 2
+        return bulk_create_lines(lines[:middle], stats) + bulk_create_lines(lines[middle:], stats)
+
+
+def create_placeholder_products(old_db, invoice_ids, product_map, default_uom, default_user):
+    """Bulk-create placeholder products for every missing product on the given invoices"""
+    old_cursor = old_db.cursor()
+    old_cursor.execute("""
+        SELECT DISTINCT m_product_id
+        FROM adempiere.c_invoiceline
+        WHERE m_product_id IS NOT NULL
+          AND c_invoice_id = ANY(%s)
+    """, (invoice_ids,))
+    missing_ids = {str(product_id) for (product_id,) in old_cursor.fetchall()} - product_map.keys()
+    old_cursor.close()
+    
+    if not missing_ids:
+        return 0
+    
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=f"Migrated Product {product_id}",
+                description=f"Product migrated from iDempiere ID: {product_id}",
+                uom=default_uom,
+                created_by=default_user,
+                updated_by=default_user,
+                legacy_id=product_id
+            )
+            for product_id in missing_ids
+        ],
+        batch_size=PRODUCT_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    
+    # Reload from the database, since ignore_conflicts leaves skipped instances unsaved
+    for product in Product.objects.filter(legacy_id__in=missing_ids):
+        product_map[product.legacy_id] = product
+    
+    print(f"Created {len(missing_ids)} placeholder products")
+    return len(missing_ids)
 
 
 def migrate_invoice_lines():
@@ -34,13 +103,12 @@ def migrate_invoice_lines():
     # Get defaults
     default_user = User.objects.filter(is_superuser=True).first()
     default_uom = UnitOfMeasure.objects.first()
-    default_category = ProductCategory.objects.first()
     
     # Build product lookup map
-    product_map = {}
-    for product in Product.objects.all():
-        if product.legacy_id:
-            product_map[product.legacy_id] = product
+    product_map = {
+        product.legacy_id: product
+        for product in Product.objects.filter(legacy_id__isnull=False).exclude(legacy_id='')
+    }
     
     stats = {
         'lines_migrated': 0,
@@ -48,17 +116,37 @@ def migrate_invoice_lines():
         'errors': []
     }
     
+    # Create every missing product before any lines are built
+    invoice_ids = [
+        int(legacy_id)
+        for legacy_id in Invoice.objects.filter(legacy_id__isnull=False, lines__isnull=True).values_list('legacy_id', flat=True)
+    ]
+    stats['products_created'] += create_placeholder_products(old_db, invoice_ids, product_map, default_uom, default_user)
+    
     print("Migrating Invoice Lines...")
     
+    # Lines are collected across invoices and flushed in LINE_BATCH_SIZE batches
+    pending_lines = []
+    
+    # Sales order line IDs keyed by legacy_id, loaded once per sales order
+    order_line_cache = {}
+    
     # Get all existing invoices with legacy_id
-    for invoice in Invoice.objects.filter(legacy_id__isnull=False):
+    # Streamed in chunks so memory stays bounded regardless of invoice count
+    for invoice in Invoice.objects.filter(legacy_id__isnull=False).iterator(chunk_size=1000):
         old_invoice_id = int(invoice.legacy_id)
         
         # Skip if invoice already has lines
         if invoice.lines.exists():
             continue
         
-        print(f"Processing invoice {invoice.document_no} (legacy ID: {old_invoice_id})")
+        order_line_ids = {}
+        if invoice.sales_order_id:
+            if invoice.sales_order_id not in order_line_cache:
+                order_line_cache[invoice.sales_order_id] = dict(
+                    SalesOrderLine.objects.filter(order_id=invoice.sales_order_id).values_list('legacy_id', 'id')
+                )
+            order_line_ids = order_line_cache[invoice.sales_order_id]
         
         old_cursor = old_db.cursor()
         
@@ -90,35 +178,17 @@ def migrate_invoice_lines():
                 line_description = row[7] or ''
                 order_line_id = row[8]
                 
-                # Find or create product
+                # Placeholders for missing products were created up front
                 product = None
                 if product_id:
                     product = product_map.get(str(product_id))
-                    if not product:
-                        # Create placeholder product
-                        product = Product.objects.create(
-                            code=f"MIGRATED-{product_id}",
-                            name=f"Migrated Product {product_id}",
-                            description=f"Product migrated from iDempiere ID: {product_id}",
-                            product_category=default_category,
-                            uom=default_uom,
-                            is_sold=True,
-                            is_purchased=False,
-                            created_by=default_user,
-                            updated_by=default_user,
-                            legacy_id=str(product_id)
-                        )
-                        product_map[str(product_id)] = product
-                        stats['products_created'] += 1
-                        print(f"  → Created placeholder product: {product.code}")
                 
                 # Find related order line (optional)
-                order_line = None
-                if order_line_id and invoice.sales_order:
-                    order_line = invoice.sales_order.lines.filter(legacy_id=str(order_line_id)).first()
+                order_line_pk = None
+                if order_line_id:
+                    order_line_pk = order_line_ids.get(str(order_line_id))
                 
-                # Create invoice line
-                InvoiceLine.objects.create(
+                pending_lines.append(InvoiceLine(
                     invoice=invoice,
                     line_no=line_no,
                     description=line_description,
@@ -127,25 +197,22 @@ def migrate_invoice_lines():
                     product=product,
                     
                     # Reference to order line
-                    order_line=order_line,
+                    order_line_id=order_line_pk,
                     
                     # Quantities
-                    quantity_invoiced=Decimal(str(qty_invoiced)) if qty_invoiced else Decimal('0'),
+                    quantity_invoiced=to_decimal(qty_invoiced),
                     
                     # Pricing
-                    price_entered=Decimal(str(price_entered)) if price_entered else Decimal('0'),
-                    price_actual=Decimal(str(price_actual)) if price_actual else Decimal('0'),
-                    discount=Decimal('0'),
-                    line_net_amount=Decimal(str(line_net_amount)) if line_net_amount else Decimal('0'),
+                    price_entered=to_decimal(price_entered),
+                    price_actual=to_decimal(price_actual),
+                    discount=ZERO,
+                    line_net_amount=to_decimal(line_net_amount),
                     
                     # Audit
                     created_by=default_user,
                     updated_by=default_user,
                     legacy_id=str(line_id)
-                )
-                
-                stats['lines_migrated'] += 1
-                print(f"  ✓ Migrated line {line_no}: {line_description}")
+                ))
                 
             except Exception as e:
                 error_msg = f"Error migrating Invoice Line ID {line_id}: {str(e)}"
@@ -153,6 +220,13 @@ def migrate_invoice_lines():
                 stats['errors'].append(error_msg)
         
         old_cursor.close()
+        
+        if len(pending_lines) >= LINE_BATCH_SIZE:
+            stats['lines_migrated'] += bulk_create_lines(pending_lines, stats)
+            print(f"  ✓ Migrated {stats['lines_migrated']} lines so far", flush=True)
+            pending_lines = []
+    
+    stats['lines_migrated'] += bulk_create_lines(pending_lines, stats)
     
     old_db.close()
     
@@ -6,7 +6,7 @@ This script migrates only sales invoices from the iDempiere database to the new
 It's based on the existing migration pattern but focuses specifically on invoices.
 
 Usage:
-    python migrate_invoices_only.py
+    python migrate_invoices_only.py [--workers N]
 
 Requirements:
     - iDempiere backup restored to temp_idempiere database
@@ -16,30 +16,92 @@ Requirements:
 
 import os
 import sys
+import argparse
+import multiprocessing
 import django
+import uuid
 import psycopg2
-from decimal import Decimal
+import psycopg2.extras
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'modern_erp.settings')
 django.setup()
 
+from django.db import connection, connections, transaction
+from django.utils import timezone
 from core.models import BusinessPartner, Organization, Currency, User, UnitOfMeasure, Contact, BusinessPartnerLocation
-from sales.models import SalesOrder, Invoice, InvoiceLine
-from inventory.models import Product, ProductCategory, PriceList
+from sales.models import SalesOrder, SalesOrderLine, Invoice, InvoiceLine
+from inventory.models import Product, PriceList
+
+
+from _utils import DOC_STATUS_MAP, ZERO, copy_rows, disable_indexes, enable_indexes, to_decimal
+
+
+@contextmanager
+def _legacy_timestamps(model):
+    """Stop auto_now/auto_now_add from overwriting a model's created and updated values"""
+    fields = [model._meta.get_field('created'), model._meta.get_field('updated')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _legacy_id_map(queryset, legacy_ids):
+    """Load the rows of a queryset matching the given legacy IDs into a dict keyed by integer legacy ID"""
+    # legacy_id is not unique, so in_bulk(field_name='legacy_id') is not an option. Keys are the
+    # source integer IDs, so lookups need no str() per row; only numeric legacy_ids can match.
+    return {
+        int(obj.legacy_id): obj
+        for obj in queryset.filter(legacy_id__in=[str(legacy_id) for legacy_id in legacy_ids or []])
+    }
 
 
 class InvoiceMigrator:
     """Migrates sales invoices from iDempiere to Modern ERP"""
     
+    # Invoice lines are loaded with COPY, bypassing the ORM, this many rows per statement.
+    # Batch sizes can be tuned per run; COPY has no bind-parameter limit, so lines batch larger.
+    LINE_BATCH_SIZE = int(os.environ.get('MIGRATE_LINE_BATCH', 10000))
+    LINE_COLUMNS = (
+        'id', 'created', 'updated', 'created_by_id', 'updated_by_id', 'is_active', 'legacy_id',
+        'invoice_id', 'line_no', 'description', 'product_id', 'order_line_id', 'quantity_invoiced',
+        'price_entered', 'price_entered_currency', 'price_actual', 'price_actual_currency', 'discount',
+        'line_net_amount', 'line_net_amount_currency', 'tax_amount', 'tax_amount_currency',
+    )
+    
+    # Invoices fall due 30 days after the invoice date (Net 30)
+    DUE_DATE_DELTA = timedelta(days=30)
+    
+    # Progress is reported once per this many migrated invoices instead of per row
+    PROGRESS_INTERVAL = 1000
+    
+    # Placeholder products are created in multi-row INSERTs of this many rows
+    PRODUCT_BATCH_SIZE = 500
+    
+    # Invoice headers are inserted with ON CONFLICT DO NOTHING in batches of this many rows
+    INVOICE_BATCH_SIZE = int(os.environ.get('MIGRATE_INVOICE_BATCH', 500))
+    
+    # Invoice headers are streamed from a server-side cursor this many rows at a time
+    STREAM_BATCH_SIZE = 2000
+    
     def __init__(self):
         # Database connections
         self.old_db = psycopg2.connect(
             host='localhost',
             database='temp_idempiere',
             user='django_user',
-            password='django_pass'
+            password='django_pass',
+            # Source rows are read by column name, e.g. row.c_invoice_id
+            cursor_factory=psycopg2.extras.NamedTupleCursor
         )
         
         # Get default values
@@ -47,60 +109,58 @@ class InvoiceMigrator:
         self.default_currency = Currency.objects.filter(iso_code='USD').first()
         self.default_user = User.objects.filter(is_superuser=True).first()
         self.default_uom = UnitOfMeasure.objects.first()
-        self.default_category = ProductCategory.objects.first()
+        self.default_price_list = PriceList.objects.filter(is_sales_price_list=True).first()
         
         # Statistics
         self.stats = {
             'invoices_migrated': 0,
             'invoice_lines_migrated': 0,
+            'invoices_skipped': 0,
             'products_created': 0,
             'errors': []
         }
         
         # Create lookup maps for performance
-        self.business_partner_map = {}
-        self.contact_map = {}
-        self.location_map = {}
-        self.product_map = {}
-        self.sales_order_map = {}
-        self.opportunity_map = {}
-        
         self._build_lookup_maps()
+        
+        # Sales order line IDs keyed by legacy_id, loaded once per sales order
+        self.order_line_cache = {}
     
     def _build_lookup_maps(self):
-        """Build lookup maps for foreign key relationships"""
+        """Build lookup maps for the foreign keys referenced by the sales invoices being migrated"""
         print("Building lookup maps...")
         
-        # Business Partners
-        for bp in BusinessPartner.objects.all():
-            if bp.legacy_id:
-                self.business_partner_map[bp.legacy_id] = bp
-        
-        # Contacts
-        for contact in Contact.objects.all():
-            if contact.legacy_id:
-                self.contact_map[contact.legacy_id] = contact
-        
-        # Business Partner Locations
-        for location in BusinessPartnerLocation.objects.all():
-            if location.legacy_id:
-                self.location_map[location.legacy_id] = location
-        
-        # Products
-        for product in Product.objects.all():
-            if product.legacy_id:
-                self.product_map[product.legacy_id] = product
+        # Collect every referenced legacy ID in one scan, so only needed rows are loaded
+        old_cursor = self.old_db.cursor()
+        old_cursor.execute("""
+            SELECT
+                array_agg(DISTINCT c_bpartner_id) FILTER (WHERE c_bpartner_id IS NOT NULL) AS bp_ids,
+                array_agg(DISTINCT ad_user_id) FILTER (WHERE ad_user_id IS NOT NULL) AS contact_ids,
+                array_agg(DISTINCT c_bpartner_location_id) FILTER (WHERE c_bpartner_location_id IS NOT NULL) AS location_ids,
+                array_agg(DISTINCT c_order_id) FILTER (WHERE c_order_id IS NOT NULL) AS order_ids,
+                array_agg(DISTINCT custom_opportunity_id) FILTER (WHERE custom_opportunity_id IS NOT NULL) AS opportunity_ids
+            FROM adempiere.c_invoice
+            WHERE issotrx = 'Y'
+        """)
+        bp_ids, contact_ids, location_ids, order_ids, opportunity_ids = old_cursor.fetchone()
         
-        # Sales Orders
-        for so in SalesOrder.objects.all():
-            if so.legacy_id:
-                self.sales_order_map[so.legacy_id] = so
+        old_cursor.execute("""
+            SELECT DISTINCT m_product_id
+            FROM adempiere.c_invoiceline
+            WHERE m_product_id IS NOT NULL
+              AND c_invoice_id IN (SELECT c_invoice_id FROM adempiere.c_invoice WHERE issotrx = 'Y')
+        """)
+        product_ids = [product_id for (product_id,) in old_cursor.fetchall()]
+        old_cursor.close()
         
-        # Opportunities
         from core.models import Opportunity
-        for opp in Opportunity.objects.all():
-            if opp.legacy_id:
-                self.opportunity_map[opp.legacy_id] = opp
+        self.business_partner_map = _legacy_id_map(BusinessPartner.objects, bp_ids)
+        self.contact_map = _legacy_id_map(Contact.objects, contact_ids)
+        self.location_map = _legacy_id_map(BusinessPartnerLocation.objects, location_ids)
+        self.product_map = _legacy_id_map(Product.objects, product_ids)
+        # Opportunities are joined in so invoices can inherit them without a query each
+        self.sales_order_map = _legacy_id_map(SalesOrder.objects.select_related('opportunity'), order_ids)
+        self.opportunity_map = _legacy_id_map(Opportunity.objects, opportunity_ids)
         
         print(f"Loaded {len(self.business_partner_map)} business partners")
         print(f"Loaded {len(self.contact_map)} contacts")
@@ -109,14 +169,20 @@ class InvoiceMigrator:
         print(f"Loaded {len(self.sales_order_map)} sales orders")
         print(f"Loaded {len(self.opportunity_map)} opportunities")
     
-    def migrate_invoices(self):
-        """Migrate sales invoices from c_invoice"""
+    def migrate_invoices(self, id_range=None):
+        """Migrate sales invoices from c_invoice, optionally limited to a (low, high) c_invoice_id range"""
         print("Migrating Sales Invoices...")
         
-        old_cursor = self.old_db.cursor()
+        range_filter, range_params = '', ()
+        if id_range:
+            range_filter, range_params = 'AND c_invoice_id BETWEEN %s AND %s', tuple(id_range)
+        
+        # Named cursor keeps the result set on the server; lines use a client-side cursor
+        old_cursor = self.old_db.cursor(name='invoice_stream')
+        old_cursor.itersize = self.STREAM_BATCH_SIZE
         
         # Query sales invoices from iDempiere
-        old_cursor.execute("""
+        old_cursor.execute(f"""
             SELECT 
                 c_invoice_id,
                 documentno,
@@ -138,151 +204,223 @@ class InvoiceMigrator:
                 custom_opportunity_id
             FROM adempiere.c_invoice
             WHERE issotrx = 'Y'  -- Sales invoices only
+              {range_filter}
             ORDER BY c_invoice_id
-        """)
+        """, range_params)
         
-        for row in old_cursor.fetchall():
-            try:
-                # Extract fields
-                invoice_id = row[0]
-                document_no = row[1]
-                description = row[2] or ''
-                doc_status = row[3]
-                date_invoiced = row[4]
-                bp_id = row[5]
-                contact_id = row[6]
-                bp_location_id = row[7]
-                grand_total = row[8]
-                total_lines = row[9]
-                order_id = row[10]  # Reference to sales order
-                created = row[11]
-                updated = row[13]
-                is_active = row[15]
-                payment_term_id = row[16]
-                opportunity_id = row[17]
-                
-                # Skip if invoice already exists
-                if Invoice.objects.filter(legacy_id=str(invoice_id)).exists():
-                    print(f"Invoice {document_no} already exists, skipping...")
-                    continue
-                
-                # Find business partner
-                business_partner = self.business_partner_map.get(str(bp_id))
-                if not business_partner:
-                    error_msg = f"Business Partner ID {bp_id} not found for Invoice {invoice_id}"
-                    print(f"Warning: {error_msg}")
-                    self.stats['errors'].append(error_msg)
-                    continue
-                
-                # Find contact (optional)
-                contact = None
-                if contact_id:
-                    contact = self.contact_map.get(str(contact_id))
-                
-                # Find locations
-                bp_location = None
-                if bp_location_id:
-                    bp_location = self.location_map.get(str(bp_location_id))
-                
-                # Use bp_location as bill_to_location since we don't have separate billing address
-                bill_to_location = bp_location
-                
-                # Find related sales order (optional)
-                sales_order = None
-                if order_id:
-                    sales_order = self.sales_order_map.get(str(order_id))
-                
-                # Find related opportunity (optional)
-                opportunity = None
-                if opportunity_id:
-                    opportunity = self.opportunity_map.get(str(opportunity_id))
-                elif sales_order and sales_order.opportunity:
-                    opportunity = sales_order.opportunity
-                
-                # Map document status
-                doc_status_map = {
-                    'DR': 'drafted',
-                    'IP': 'in_progress',
-                    'CO': 'complete',
-                    'CL': 'closed',
-                    'RE': 'reversed',
-                    'VO': 'voided'
-                }
-                
-                # Calculate due date (default 30 days from invoice date)
-                due_date = date_invoiced + timedelta(days=30)
-                
-                # Get default price list
-                price_list = PriceList.objects.filter(is_sales_price_list=True).first()
-                
-                # Create the invoice
-                invoice = Invoice.objects.create(
-                    organization=self.default_org,
-                    document_no=document_no,
-                    description=description,
-                    doc_status=doc_status_map.get(doc_status, 'drafted'),
-                    invoice_type='standard',
+        # Lines for all sales invoices arrive in one stream, in the same c_invoice_id order
+        line_groups = self._stream_invoice_lines(range_filter, range_params)
+        line_group = next(line_groups, None)
+        
+        while True:
+            rows = old_cursor.fetchmany(self.STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            
+            # (invoice, line rows) pairs, inserted together once the batch is built
+            candidates = []
+            for row in rows:
+                try:
+                    # Find business partner
+                    business_partner = self.business_partner_map.get(row.c_bpartner_id)
+                    if not business_partner:
+                        error_msg = f"Business Partner ID {row.c_bpartner_id} not found for Invoice {row.c_invoice_id}"
+                        print(f"Warning: {error_msg}")
+                        self.stats['errors'].append(error_msg)
+                        continue
+                    
+                    # Find contact (optional)
+                    contact = None
+                    if row.ad_user_id:
+                        contact = self.contact_map.get(row.ad_user_id)
                     
-                    # Dates
-                    date_invoiced=date_invoiced,
-                    date_accounting=date_invoiced,
-                    due_date=due_date,
+                    # Find locations
+                    bp_location = None
+                    if row.c_bpartner_location_id:
+                        bp_location = self.location_map.get(row.c_bpartner_location_id)
                     
-                    # Business partner and contacts
-                    business_partner=business_partner,
-                    contact=contact,
-                    internal_user=self.default_user,  # Our company contact
+                    # Use bp_location as bill_to_location since we don't have separate billing address
+                    bill_to_location = bp_location
                     
-                    # Addresses
-                    business_partner_location=bp_location,
-                    bill_to_location=bill_to_location,
+                    # Find related sales order (optional)
+                    sales_order = None
+                    if row.c_order_id:
+                        sales_order = self.sales_order_map.get(row.c_order_id)
                     
-                    # References
-                    sales_order=sales_order,
-                    opportunity=opportunity,
+                    # Find related opportunity (optional)
+                    opportunity = None
+                    if row.custom_opportunity_id:
+                        opportunity = self.opportunity_map.get(row.custom_opportunity_id)
+                    elif sales_order and sales_order.opportunity:
+                        opportunity = sales_order.opportunity
                     
-                    # Pricing
-                    price_list=price_list,
-                    currency=self.default_currency,
-                    payment_terms='Net 30',  # Default payment terms
+                    # Calculate due date (default 30 days from invoice date)
+                    due_date = row.dateinvoiced + self.DUE_DATE_DELTA
                     
-                    # Totals
-                    total_lines=Decimal(str(total_lines)) if total_lines else Decimal('0.00'),
-                    grand_total=Decimal(str(grand_total)) if grand_total else Decimal('0.00'),
-                    open_amount=Decimal(str(grand_total)) if grand_total else Decimal('0.00'),
+                    # Advance the line stream past skipped invoices to this one
+                    while line_group and line_group[0] < row.c_invoice_id:
+                        line_group = next(line_groups, None)
                     
-                    # Sales rep
-                    sales_rep=self.default_user,
+                    invoice_lines = []
+                    if line_group and line_group[0] == row.c_invoice_id:
+                        invoice_lines = list(line_group[1])
                     
-                    # Audit fields
-                    created=created,
+                    invoice = Invoice(
+                        organization=self.default_org,
+                        document_no=row.documentno,
+                        description=row.description or '',
+                        doc_status=DOC_STATUS_MAP.get(row.docstatus, 'drafted'),
+                        invoice_type='standard',
+                        
+                        # Dates
+                        date_invoiced=row.dateinvoiced,
+                        date_accounting=row.dateinvoiced,
+                        due_date=due_date,
+                        
+                        # Business partner and contacts
+                        business_partner=business_partner,
+                        contact=contact,
+                        internal_user=self.default_user,  # Our company contact
+                        
+                        # Addresses
+                        business_partner_location=bp_location,
+                        bill_to_location=bill_to_location,
+                        
+                        # References
+                        sales_order=sales_order,
+                        opportunity=opportunity,
+                        
+                        # Pricing
+                        price_list=self.default_price_list,
+                        currency=self.default_currency,
+                        payment_terms='Net 30',  # Default payment terms
+                        
+                        # Totals
+                        total_lines=to_decimal(row.totallines),
+                        grand_total=to_decimal(row.grandtotal),
+                        open_amount=to_decimal(row.grandtotal),
+                        
+                        # Sales rep
+                        sales_rep=self.default_user,
+                        
+                        # Audit fields
+                        created=row.created,
+                        created_by=self.default_user,
+                        updated=row.updated,
+                        updated_by=self.default_user,
+                        is_active=row.isactive == 'Y',
+                        legacy_id=str(row.c_invoice_id)
+                    )
+                    candidates.append((invoice, invoice_lines))
+                    
+                except Exception as e:
+                    error_msg = f"Error migrating Invoice ID {row.c_invoice_id}: {str(e)}"
+                    print(f"✗ {error_msg}")
+                    self.stats['errors'].append(error_msg)
+            
+            self._migrate_invoice_batch(candidates)
+            
+        line_groups.close()
+        old_cursor.close()
+        print(f"Completed: {self.stats['invoices_migrated']} invoices migrated")
+    
+    def _migrate_invoice_batch(self, candidates):
+        """Insert a batch of invoices, skipping existing ones, then load the lines of those inserted"""
+        failed_ids = self._bulk_create_invoices([invoice for invoice, _ in candidates])
+        
+        # ignore_conflicts returns every instance, so read back which ones were actually inserted
+        stored_ids = dict(
+            Invoice.objects.filter(legacy_id__in=[invoice.legacy_id for invoice, _ in candidates])
+            .values_list('legacy_id', 'id')
+        )
+        
+        lines = []
+        for invoice, line_rows in candidates:
+            stored_id = stored_ids.get(invoice.legacy_id)
+            if stored_id is not None and stored_id != invoice.id:
+                self.stats['invoices_skipped'] += 1
+                continue
+            if stored_id is None:
+                if invoice.legacy_id not in failed_ids:
+                    error_msg = f"Invoice ID {invoice.legacy_id} skipped: document number {invoice.document_no} already exists"
+                    print(f"✗ {error_msg}")
+                    self.stats['errors'].append(error_msg)
+                continue
+            
+            lines.extend(self._build_invoice_lines(line_rows, invoice))
+            
+            self.stats['invoices_migrated'] += 1
+            if self.stats['invoices_migrated'] % self.PROGRESS_INTERVAL == 0:
+                print(f"  ✓ Migrated {self.stats['invoices_migrated']} invoices so far", flush=True)
+        
+        for start in range(0, len(lines), self.LINE_BATCH_SIZE):
+            self.stats['invoice_lines_migrated'] += self._copy_invoice_lines(lines[start:start + self.LINE_BATCH_SIZE])
+    
+    def _bulk_create_invoices(self, invoices):
+        """Insert invoices with ON CONFLICT DO NOTHING, splitting a failing batch; returns the failed legacy IDs"""
+        if not invoices:
+            return set()
+        
+        try:
+            with transaction.atomic():
+                Invoice.objects.bulk_create(invoices, batch_size=self.INVOICE_BATCH_SIZE, ignore_conflicts=True)
+            return set()
+        
+        except Exception as e:
+            if len(invoices) == 1:
+                error_msg = f"Error migrating Invoice ID {invoices[0].legacy_id}: {str(e)}"
+                print(f"✗ {error_msg}")
+                self.stats['errors'].append(error_msg)
+                return {invoices[0].legacy_id}
+            
+            middle = len(invoices) // 2
+            return self._bulk_create_invoices(invoices[:middle]) | self._bulk_create_invoices(invoices[middle:])
+    
+    def _create_placeholder_products(self):
+        """Bulk-create placeholder products for every missing product referenced by a sales invoice line"""
+        old_cursor = self.old_db.cursor()
+        old_cursor.execute("""
+            SELECT DISTINCT m_product_id
+            FROM adempiere.c_invoiceline
+            WHERE m_product_id IS NOT NULL
+              AND c_invoice_id IN (SELECT c_invoice_id FROM adempiere.c_invoice WHERE issotrx = 'Y')
+        """)
+        missing_ids = {product_id for (product_id,) in old_cursor.fetchall()} - self.product_map.keys()
+        old_cursor.close()
+        
+        if not missing_ids:
+            return
+        
+        Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"Migrated Product {product_id}",
+                    description=f"Product migrated from iDempiere ID: {product_id}",
+                    uom=self.default_uom,
                     created_by=self.default_user,
-                    updated=updated,
                     updated_by=self.default_user,
-                    is_active=is_active == 'Y',
-                    legacy_id=str(invoice_id)
+                    legacy_id=str(product_id)
                 )
-                
-                # Migrate invoice lines
-                self.migrate_invoice_lines(invoice_id, invoice)
-                
-                self.stats['invoices_migrated'] += 1
-                print(f"✓ Migrated Invoice: {document_no}")
-                
-            except Exception as e:
-                error_msg = f"Error migrating Invoice ID {invoice_id}: {str(e)}"
-                print(f"✗ {error_msg}")
-                self.stats['errors'].append(error_msg)
+                for product_id in missing_ids
+            ],
+            batch_size=self.PRODUCT_BATCH_SIZE,
+            ignore_conflicts=True
+        )
         
-        old_cursor.close()
-        print(f"Completed: {self.stats['invoices_migrated']} invoices migrated")
+        # Reload from the database, since ignore_conflicts leaves skipped instances unsaved
+        self.product_map.update(_legacy_id_map(Product.objects, missing_ids))
+        
+        self.stats['products_created'] += len(missing_ids)
+        print(f"Created {len(missing_ids)} placeholder products")
     
-    def migrate_invoice_lines(self, old_invoice_id, new_invoice):
-        """Migrate invoice lines for a given invoice"""
-        old_cursor = self.old_db.cursor()
+    def _stream_invoice_lines(self, range_filter='', range_params=()):
+        """Yield (c_invoice_id, rows) groups of sales invoice lines in c_invoice_id order"""
+        line_cursor = self.old_db.cursor(name='invoice_line_stream')
+        line_cursor.itersize = self.STREAM_BATCH_SIZE
         
-        old_cursor.execute("""
+        line_cursor.execute(f"""
             SELECT 
+                c_invoice_id,
                 c_invoiceline_id,
                 line,
                 m_product_id,
@@ -294,87 +432,144 @@ class InvoiceMigrator:
                 c_orderline_id,
                 c_tax_id
             FROM adempiere.c_invoiceline 
-            WHERE c_invoice_id = %s
-            ORDER BY line
-        """, (old_invoice_id,))
+            WHERE c_invoice_id IN (SELECT c_invoice_id FROM adempiere.c_invoice WHERE issotrx = 'Y')
+              {range_filter}
+            ORDER BY c_invoice_id, line
+        """, range_params)
+        
+        try:
+            yield from groupby(line_cursor, key=itemgetter(0))
+        finally:
+            line_cursor.close()
+    
+    def _build_invoice_lines(self, line_rows, new_invoice):
+        """Map the source line rows of a given invoice to LINE_COLUMNS tuples"""
+        now = timezone.now()
         
-        for row in old_cursor.fetchall():
+        order_line_ids = {}
+        if new_invoice.sales_order_id:
+            order_line_ids = self._order_line_ids(new_invoice.sales_order_id)
+        
+        lines = []
+        for row in line_rows:
             try:
-                line_id = row[0]
-                line_no = row[1]
-                product_id = row[2]
-                qty_invoiced = row[3]
-                price_entered = row[4]
-                price_actual = row[5]
-                line_net_amount = row[6]
-                line_description = row[7] or ''
-                order_line_id = row[8]
-                tax_id = row[9]
-                
-                # Find or create product
+                # Placeholders for missing products were created up front
                 product = None
-                if product_id:
-                    product = self.product_map.get(str(product_id))
-                    if not product:
-                        # Create placeholder product
-                        product = Product.objects.create(
-                            code=f"MIGRATED-{product_id}",
-                            name=f"Migrated Product {product_id}",
-                            description=f"Product migrated from iDempiere ID: {product_id}",
-                            product_category=self.default_category,
-                            uom=self.default_uom,
-                            is_sold=True,
-                            is_purchased=False,
-                            created_by=self.default_user,
-                            updated_by=self.default_user,
-                            legacy_id=str(product_id)
-                        )
-                        self.product_map[str(product_id)] = product
-                        self.stats['products_created'] += 1
-                        print(f"  → Created placeholder product: {product.code}")
+                if row.m_product_id:
+                    product = self.product_map.get(row.m_product_id)
                 
                 # Find related order line (optional)
-                order_line = None
-                if order_line_id and new_invoice.sales_order:
-                    order_line = new_invoice.sales_order.lines.filter(legacy_id=str(order_line_id)).first()
+                order_line_pk = None
+                if row.c_orderline_id:
+                    order_line_pk = order_line_ids.get(row.c_orderline_id)
                 
-                # Create invoice line
-                InvoiceLine.objects.create(
-                    invoice=new_invoice,
-                    line_no=line_no,
-                    description=line_description,
-                    
-                    # Product
-                    product=product,
-                    
-                    # Reference to order line
-                    order_line=order_line,
-                    
-                    # Quantities
-                    quantity_invoiced=Decimal(str(qty_invoiced)) if qty_invoiced else Decimal('0'),
-                    
-                    # Pricing
-                    price_entered=Decimal(str(price_entered)) if price_entered else Decimal('0'),
-                    price_actual=Decimal(str(price_actual)) if price_actual else Decimal('0'),
-                    discount=Decimal('0'),  # No discount info available in iDempiere
-                    line_net_amount=Decimal(str(line_net_amount)) if line_net_amount else Decimal('0'),
-                    
-                    # Audit
-                    created_by=self.default_user,
-                    updated_by=self.default_user,
-                    legacy_id=str(line_id)
-                )
-                
-                self.stats['invoice_lines_migrated'] += 1
+                # Values follow LINE_COLUMNS
+                lines.append((
+                    uuid.uuid4(),
+                    now,
+                    now,
+                    self.default_user.id,
+                    self.default_user.id,
+                    True,
+                    str(row.c_invoiceline_id),
+                    new_invoice.id,
+                    row.line,
+                    row.description or '',
+                    product.id if product else None,
+                    order_line_pk,
+                    to_decimal(row.qtyinvoiced),
+                    to_decimal(row.priceentered),
+                    'USD',
+                    to_decimal(row.priceactual),
+                    'USD',
+                    ZERO,  # No discount info available in iDempiere
+                    to_decimal(row.linenetamt),
+                    'USD',
+                    ZERO,
+                    'USD',
+                ))
                 
             except Exception as e:
-                error_msg = f"Error migrating Invoice Line ID {line_id}: {str(e)}"
+                error_msg = f"Error migrating Invoice Line ID {row.c_invoiceline_id}: {str(e)}"
                 print(f"    ✗ {error_msg}")
                 self.stats['errors'].append(error_msg)
         
+        return lines
+    
+    def _order_line_ids(self, sales_order_id):
+        """Return a sales order's line IDs keyed by integer legacy ID, querying each order only once"""
+        if sales_order_id not in self.order_line_cache:
+            self.order_line_cache[sales_order_id] = {
+                int(legacy_id): line_id
+                for legacy_id, line_id in SalesOrderLine.objects.filter(order_id=sales_order_id).values_list('legacy_id', 'id')
+                if legacy_id and legacy_id.isdigit()
+            }
+        return self.order_line_cache[sales_order_id]
+    
+    def _copy_invoice_lines(self, lines):
+        """Load invoice line tuples with a single COPY, splitting a failing batch to isolate bad lines"""
+        if not lines:
+            return 0
+        
+        try:
+            with transaction.atomic():
+                copy_rows(InvoiceLine._meta.db_table, self.LINE_COLUMNS, lines)
+            return len(lines)
+        
+        except Exception as e:
+            if len(lines) == 1:
+                error_msg = f"Error migrating Invoice Line ID {lines[0][6]}: {str(e)}"
+                print(f"    ✗ {error_msg}")
+                self.stats['errors'].append(error_msg)
+                return 0
+            
+            middle = len(lines) // 2
+            return self._copy_invoice_lines(lines[:middle]) + self._copy_invoice_lines(lines[middle:])
+    
+    def migrate_invoices_in_transaction(self, id_range=None):
+        """Migrate invoices in a single transaction"""
+        # One transaction for the whole load, so rows don't each pay a commit
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Migration data can be reloaded, so don't wait for WAL flush on commit
+                cursor.execute("SET LOCAL synchronous_commit = OFF")
+            
+            # Invoices carry their legacy created/updated values
+            with _legacy_timestamps(Invoice):
+                self.migrate_invoices(id_range)
+    
+    def _invoice_id_ranges(self, workers):
+        """Split the sales invoice c_invoice_id space into contiguous, non-overlapping ranges"""
+        old_cursor = self.old_db.cursor()
+        old_cursor.execute("SELECT min(c_invoice_id), max(c_invoice_id) FROM adempiere.c_invoice WHERE issotrx = 'Y'")
+        low, high = old_cursor.fetchone()
         old_cursor.close()
+        
+        # No sales invoices at all: min/max are both NULL
+        if low is None:
+            return []
+        
+        # c_invoice_id is numeric(10,0), which psycopg2 returns as Decimal; range() needs ints
+        low, high = int(low), int(high)
+        step = (high - low) // workers + 1
+        return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
     
-    def run_migration(self):
+    def migrate_invoices_in_parallel(self, workers):
+        """Migrate invoices with one worker process per c_invoice_id range"""
+        id_ranges = self._invoice_id_ranges(workers)
+        
+        # Forked children must not share this process's database sockets
+        self.old_db.close()
+        connections.close_all()
+        
+        with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+            for worker_stats in pool.imap_unordered(_migrate_invoice_range, id_ranges):
+                self.stats['invoices_migrated'] += worker_stats['invoices_migrated']
+                self.stats['invoice_lines_migrated'] += worker_stats['invoice_lines_migrated']
+                self.stats['invoices_skipped'] += worker_stats['invoices_skipped']
+                self.stats['errors'].extend(worker_stats['errors'])
+    
+    def run_migration(self, workers=1):
         """Run the invoice migration process"""
         print("Starting Invoice Migration from iDempiere...")
         print("=" * 60)
@@ -382,7 +577,21 @@ class InvoiceMigrator:
         start_time = datetime.now()
         
         try:
-            self.migrate_invoices()
+            # Placeholders are committed first so every worker sees them
+            with transaction.atomic():
+                self._create_placeholder_products()
+            
+            # Load lines without incremental index and FK maintenance
+            table = InvoiceLine._meta.db_table
+            indexes, foreign_keys = disable_indexes(table)
+            try:
+                if workers > 1:
+                    self.migrate_invoices_in_parallel(workers)
+                else:
+                    self.migrate_invoices_in_transaction()
+            finally:
+                print("Rebuilding invoice line indexes and foreign keys...")
+                enable_indexes(table, indexes, foreign_keys)
             
             # Print summary
             print("\n" + "=" * 60)
@@ -390,6 +599,7 @@ class InvoiceMigrator:
             print("=" * 60)
             print(f"Invoices migrated: {self.stats['invoices_migrated']}")
             print(f"Invoice lines migrated: {self.stats['invoice_lines_migrated']}")
+            print(f"Invoices already migrated: {self.stats['invoices_skipped']}")
             print(f"Products created: {self.stats['products_created']}")
             print(f"Errors: {len(self.stats['errors'])}")
             
@@ -412,8 +622,28 @@ class InvoiceMigrator:
                 self.old_db.close()
 
 
+def _init_worker():
+    """Drop database connections inherited from the parent process"""
+    connections.close_all()
+
+
+def _migrate_invoice_range(id_range):
+    """Migrate one c_invoice_id range in a worker process and return its stats"""
+    migrator = InvoiceMigrator()
+    try:
+        migrator.migrate_invoices_in_transaction(id_range)
+    finally:
+        migrator.old_db.close()
+    return migrator.stats
+
+
 def main():
     """Main migration function"""
+    parser = argparse.ArgumentParser(description='Migrate sales invoices from iDempiere')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes, each migrating its own c_invoice_id range')
+    args = parser.parse_args()
+    
     print("Invoice Migration Script")
     print("=" * 40)
     
@@ -425,7 +655,7 @@ def main():
     
     # Run migration
     migrator = InvoiceMigrator()
-    migrator.run_migration()
+    migrator.run_migration(workers=args.workers)
     
     print("\nInvoice migration completed!")
 
@@ -14,24 +14,39 @@ import os
 import sys
 import django
 import psycopg2
+from datetime import date, timedelta
 from decimal import Decimal
+from itertools import groupby
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'modern_erp.settings')
 django.setup()
 
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import F
 from core.models import BusinessPartner, BusinessPartnerLocation, Contact, PaymentTerms, Organization, Currency, User
 from sales.models import Invoice, InvoiceLine, SalesOrder
 from inventory.models import Product, Warehouse, PriceList
 from djmoney.money import Money
 
+from _utils import DOC_STATUS_MAP, build_legacy_map, copy_instances, to_decimal
+
+# Number of invoices whose lines are fetched with a single c_invoiceline query
+LINE_FETCH_BATCH_SIZE = 1000
+INVOICE_BULK_SIZE = 500
+
+_ZERO = Decimal('0.00')
+
+
+@transaction.atomic
 def migrate_invoices_with_lines():
     """Migrate invoices AND invoice lines from iDempiere"""
     
-    # Connect to iDempiere database
+    # Connect to iDempiere database. When it is co-located, set
+    # IDEMPIERE_DB_HOST to the socket directory (e.g. /var/run/postgresql)
+    # to connect over a Unix socket instead of loopback TCP
     idempiere_conn = psycopg2.connect(
-        host='localhost',
+        host=os.environ.get('IDEMPIERE_DB_HOST', 'localhost'),
         database='idempiere',
         user='django_user',
         password='django_pass'
@@ -49,84 +64,60 @@ def migrate_invoices_with_lines():
     print(f"Currency: {default_currency}, Payment Terms: {default_payment_terms}")
     print(f"Warehouse: {default_warehouse}, Price List: {default_price_list}")
     
-    # Create mappings for performance
-    bp_map = {}
-    contact_map = {}
-    location_map = {}
-    product_map = {}
-    sales_order_map = {}
-    
-    # Build business partner mapping
-    for bp in BusinessPartner.objects.exclude(legacy_id__isnull=True):
-        if bp.legacy_id:
-            try:
-                legacy_key = int(bp.legacy_id)
-            except ValueError:
-                legacy_key = bp.legacy_id
-            bp_map[legacy_key] = bp
-    
-    # Build contact mapping
-    for contact in Contact.objects.exclude(legacy_id__isnull=True):
-        if contact.legacy_id:
-            try:
-                legacy_key = int(contact.legacy_id)
-            except ValueError:
-                legacy_key = contact.legacy_id
-            contact_map[legacy_key] = contact
-    
-    # Build location mapping
-    for location in BusinessPartnerLocation.objects.exclude(legacy_id__isnull=True):
-        if location.legacy_id:
-            try:
-                legacy_key = int(location.legacy_id)
-            except ValueError:
-                legacy_key = location.legacy_id
-            location_map[legacy_key] = location
-    
-    # Build product mapping
-    for product in Product.objects.exclude(legacy_id__isnull=True):
-        if product.legacy_id:
-            try:
-                legacy_key = int(product.legacy_id)
-            except ValueError:
-                legacy_key = product.legacy_id
-            product_map[legacy_key] = product
-    
-    # Build sales order mapping
-    for order in SalesOrder.objects.exclude(legacy_id__isnull=True):
-        if order.legacy_id:
-            try:
-                legacy_key = int(order.legacy_id)
-            except ValueError:
-                legacy_key = order.legacy_id
-            sales_order_map[legacy_key] = order
+    # Create mappings for performance: only the PK is needed to set each FK,
+    # so skip loading full model instances
+    bp_map = build_legacy_map(BusinessPartner)
+    customer_bp_ids = set(BusinessPartner.objects.filter(is_customer=True).values_list('pk', flat=True))
+    contact_map = build_legacy_map(Contact)
+    location_map = build_legacy_map(BusinessPartnerLocation)
+    product_map = build_legacy_map(Product)
+    sales_order_map = build_legacy_map(SalesOrder)
     
     print(f"Loaded mappings: {len(bp_map)} BPs, {len(contact_map)} contacts, {len(location_map)} locations")
     print(f"Products: {len(product_map)}, Sales Orders: {len(sales_order_map)}")
     
     # Preserve new invoices (those without legacy_id)
     print("Preserving new invoices...")
-    new_invoices = []
-    for invoice in Invoice.objects.filter(legacy_id__isnull=True):
-        new_invoices.append({
-            'id': invoice.id,
-            'document_no': invoice.document_no,
-            'partner': invoice.business_partner.name,
-            'total': invoice.grand_total
-        })
-        print(f"  Will preserve: {invoice.document_no} - {invoice.business_partner.name} - {invoice.grand_total}")
+    new_invoices = list(Invoice.objects.filter(legacy_id__isnull=True).values(
+        'id', 'document_no', partner=F('business_partner__name'), total=F('grand_total')
+    ))
+    for preserved in new_invoices:
+        print(f"  Will preserve: {preserved['document_no']} - {preserved['partner']} - {preserved['total']}")
     
     # Clear existing LEGACY invoices only
     print("Clearing existing LEGACY invoices...")
-    legacy_invoices = Invoice.objects.exclude(legacy_id__isnull=True)
+    legacy_invoices = Invoice.objects.filter(legacy_id__isnull=False)
     print(f"Found {legacy_invoices.count()} legacy invoices to remove")
     
-    # Remove lines first, then invoices
-    for invoice in legacy_invoices:
-        invoice.lines.all().delete()
+    # Remove lines first, then invoices, with one DELETE each
+    InvoiceLine.objects.filter(invoice__legacy_id__isnull=False).delete()
     legacy_invoices.delete()
     
-    cursor = idempiere_conn.cursor()
+    # Stream invoices through a server-side cursor instead of fetchall();
+    # lines are read on a separate client-side cursor since the named
+    # cursor stays open for the whole loop.
+    cursor = idempiere_conn.cursor(name='c_invoice_stream', withhold=False)
+    cursor.itersize = 5000
+    line_cursor = idempiere_conn.cursor()
+    
+    # The lines query runs once per invoice batch, so parse and plan it once
+    line_cursor.execute("""
+        PREPARE legacy_invoice_lines (numeric[]) AS
+        SELECT 
+            il.c_invoice_id,
+            il.c_invoiceline_id,
+            il.line,
+            il.m_product_id,
+            il.qtyinvoiced,
+            il.priceentered,
+            il.priceactual,
+            il.linenetamt,
+            il.description,
+            il.c_charge_id
+        FROM adempiere.c_invoiceline il
+        WHERE il.c_invoice_id = ANY($1)
+        ORDER BY il.c_invoice_id, il.line
+    """)
     
     # Get invoices from iDempiere (issotrx = 'Y' for sales invoices)
     cursor.execute("""
@@ -159,81 +150,87 @@ def migrate_invoices_with_lines():
     invoices_created = 0
     lines_created = 0
     errors = []
+    batch_invoices = {}
+    # Business partners of the invoices actually written, flagged as customers after the loop
+    written_bp_ids = set()
     
-    for row in cursor.fetchall():
+    for row in cursor:
+        # One unpack per row into locals, in the column order of the query above
+        (inv_id, docno, descr, docstatus, d_inv, d_acct, c_bp_id, user_id, loc_id, bill_loc_id,
+         grand, totlines, order_id, issotrx, created, _cby, updated, _uby, isactive, ispaid) = row
         try:
-            bp = bp_map.get(row[6])
-            if not bp:
-                errors.append(f"No business partner found for Invoice {row[0]}")
+            bp_id = bp_map.get(c_bp_id)
+            if not bp_id:
+                errors.append(f"No business partner found for Invoice {inv_id}")
                 continue
             
-            # Ensure this BP is marked as a customer for sales invoices
-            if not bp.is_customer:
-                bp.is_customer = True
-                bp.save()
-                print(f"  Updated BP {bp.name} to be a customer")
-            
-            contact = contact_map.get(row[7]) if row[7] else None
-            location = location_map.get(row[8]) if row[8] else None
-            bill_to_location = location_map.get(row[9]) if row[9] else None
-            sales_order = sales_order_map.get(row[12]) if row[12] else None
+            contact_id = contact_map.get(user_id) if user_id else None
+            location_id = location_map.get(loc_id) if loc_id else None
+            bill_to_location_id = location_map.get(bill_loc_id) if bill_loc_id else None
+            sales_order_id = sales_order_map.get(order_id) if order_id else None
             
-            # Map document status for invoices
-            doc_status_map = {
-                'DR': 'drafted',
-                'IP': 'in_progress',
-                'CO': 'complete',
-                'CL': 'closed',
-                'RE': 'reversed',
-                'VO': 'voided'
-            }
+            date_invoiced = d_inv or date(2022, 1, 1)
             
-            invoice = Invoice.objects.create(
+            invoice = Invoice(
                 organization=default_org,
-                document_no=row[1],
-                description=row[2] or 'Migrated from iDempiere',
-                doc_status=doc_status_map.get(row[3], 'drafted'),
-                date_invoiced=row[4] or '2022-01-01',
-                date_acct=row[5] or row[4] or '2022-01-01',
-                business_partner=bp,
-                contact=contact,
-                business_partner_location=location,
-                bill_to_location=bill_to_location,
-                sales_order=sales_order,
+                document_no=docno,
+                description=descr or 'Migrated from iDempiere',
+                doc_status=DOC_STATUS_MAP.get(docstatus, 'drafted'),
+                date_invoiced=date_invoiced,
+                date_accounting=d_acct or date_invoiced,
+                due_date=date_invoiced + timedelta(days=30),
+                business_partner_id=bp_id,
+                contact_id=contact_id,
+                business_partner_location_id=location_id,
+                bill_to_location_id=bill_to_location_id,
+                sales_order_id=sales_order_id,
                 currency=default_currency,
                 price_list=default_price_list,
-                warehouse=default_warehouse,
-                payment_terms=default_payment_terms,
-                total_lines=Money(Decimal(str(row[11])), 'USD') if row[11] else Money(0, 'USD'),
-                grand_total=Money(Decimal(str(row[10])), 'USD') if row[10] else Money(0, 'USD'),
-                is_paid=(row[19] == 'Y'),
-                created=row[14],
+                payment_terms=default_payment_terms.name if default_payment_terms else 'Net 30',
+                total_lines=Money(to_decimal(totlines), 'USD'),
+                grand_total=Money(to_decimal(grand), 'USD'),
+                is_paid=(ispaid == 'Y'),
+                created=created,
                 created_by=default_user,
-                updated=row[16],
+                updated=updated,
                 updated_by=default_user,
-                is_active=(row[18] == 'Y'),
-                legacy_id=str(row[0])
+                is_active=(isactive == 'Y'),
+                legacy_id=str(inv_id)
             )
             
-            # Migrate invoice lines
-            invoice_lines_created = migrate_invoice_lines(cursor, row[0], invoice, product_map, default_user)
-            lines_created += invoice_lines_created
+            batch_invoices[inv_id] = invoice
             
-            invoices_created += 1
-            
-            if invoices_created <= 10:
-                print(f"  Created Invoice: {invoice.document_no} - {bp.name}")
-                if contact:
-                    print(f"    Contact: {contact.name}")
-                if sales_order:
-                    print(f"    Sales Order: {sales_order.document_no}")
-                if invoice_lines_created > 0:
-                    print(f"    Lines: {invoice_lines_created}")
+            if invoices_created + len(batch_invoices) <= 10:
+                print(f"  Prepared Invoice: {invoice.document_no}")
                     
         except Exception as e:
-            errors.append(f"Invoice {row[0]}: {str(e)}")
-            print(f"  Error with Invoice {row[0]}: {str(e)}")
+            errors.append(f"Invoice {inv_id}: {str(e)}")
+            print(f"  Error with Invoice {inv_id}: {str(e)}")
+        
+        # Write invoices and their lines a whole batch at a time
+        if len(batch_invoices) >= LINE_FETCH_BATCH_SIZE:
+            written, batch_lines_created = save_invoice_batch(
+                line_cursor, batch_invoices, product_map, default_user, errors)
+            invoices_created += len(written)
+            lines_created += batch_lines_created
+            written_bp_ids.update(invoice.business_partner_id for invoice in written)
+            batch_invoices = {}
+    
+    written, batch_lines_created = save_invoice_batch(
+        line_cursor, batch_invoices, product_map, default_user, errors)
+    invoices_created += len(written)
+    lines_created += batch_lines_created
+    written_bp_ids.update(invoice.business_partner_id for invoice in written)
+    
+    # Ensure the BPs are marked as customers for sales invoices
+    bp_needs_customer = written_bp_ids - customer_bp_ids
+    if bp_needs_customer:
+        BusinessPartner.objects.filter(pk__in=bp_needs_customer).update(is_customer=True)
+        print(f"Updated {len(bp_needs_customer)} BPs to be customers")
     
+    update_legacy_invoice_totals()
+    
+    line_cursor.close()
     cursor.close()
     idempiere_conn.close()
     
@@ -248,86 +245,133 @@ def migrate_invoices_with_lines():
     
     # Verify preservation of new invoices
     print(f"\nVerification - Preserved {len(new_invoices)} new invoices:")
+    existing = Invoice.objects.select_related('business_partner').in_bulk([p['id'] for p in new_invoices])
     for preserved in new_invoices:
-        try:
-            invoice = Invoice.objects.get(id=preserved['id'])
+        invoice = existing.get(preserved['id'])
+        if invoice:
             print(f"  ✓ {invoice.document_no} - {invoice.business_partner.name} - {invoice.grand_total}")
-        except Invoice.DoesNotExist:
+        else:
             print(f"  ✗ Invoice ID {preserved['id']} was accidentally deleted!")
 
-def migrate_invoice_lines(cursor, old_invoice_id, new_invoice, product_map, default_user):
-    """Migrate invoice lines for a specific invoice"""
+def save_invoice_batch(cursor, batch_invoices, product_map, default_user, errors):
+    """Bulk insert a batch of invoices keyed by iDempiere c_invoice_id, with their lines.
     
-    cursor.execute("""
-        SELECT 
-            il.c_invoiceline_id,
-            il.line,
-            il.m_product_id,
-            il.qtyinvoiced,
-            il.priceentered,
-            il.priceactual,
-            il.linenetamt,
-            il.description,
-            il.c_charge_id
-        FROM adempiere.c_invoiceline il
-        WHERE il.c_invoice_id = %s
-        ORDER BY il.line
-    """, (old_invoice_id,))
+    A failing batch is split and retried so a bad invoice only loses itself.
+    Returns the invoices written and the number of lines written.
+    """
     
-    lines_created = 0
+    if not batch_invoices:
+        return [], 0
+    
+    try:
+        with transaction.atomic():
+            Invoice.objects.bulk_create(batch_invoices.values(), batch_size=INVOICE_BULK_SIZE)
+            
+            line_objs = build_batch_invoice_lines(cursor, batch_invoices, product_map, default_user)
+            copy_instances(InvoiceLine, line_objs)
+        return list(batch_invoices.values()), len(line_objs)
+    
+    except Exception as e:
+        if len(batch_invoices) == 1:
+            old_invoice_id = next(iter(batch_invoices))
+            errors.append(f"Invoice {old_invoice_id}: {str(e)}")
+            print(f"  Error with Invoice {old_invoice_id}: {str(e)}")
+            return [], 0
+        
+        items = list(batch_invoices.items())
+        middle = len(items) // 2
+        first_written, first_lines = save_invoice_batch(
+            cursor, dict(items[:middle]), product_map, default_user, errors)
+        second_written, second_lines = save_invoice_batch(
+            cursor, dict(items[middle:]), product_map, default_user, errors)
+        return first_written + second_written, first_lines + second_lines
+
+def update_legacy_invoice_totals():
+    """Recalculate totals of legacy invoices that have lines with one aggregate UPDATE"""
+    
+    # Same result as Invoice.calculate_totals() (no tax yet) without a
+    # query and save per invoice
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {Invoice._meta.db_table} i
+            SET total_lines = s.total,
+                grand_total = s.total,
+                open_amount = CASE WHEN i.is_paid THEN i.open_amount ELSE s.total - i.paid_amount END
+            FROM (
+                SELECT invoice_id, SUM(line_net_amount) AS total
+                FROM {InvoiceLine._meta.db_table}
+                GROUP BY invoice_id
+            ) s
+            WHERE s.invoice_id = i.id
+              AND i.legacy_id IS NOT NULL
+        """)
+        print(f"Recalculated totals for {cursor.rowcount} invoices")
+
+def build_batch_invoice_lines(cursor, batch_invoices, product_map, default_user):
+    """Build invoice lines for a batch of invoices keyed by iDempiere c_invoice_id"""
+    
+    cursor.execute("EXECUTE legacy_invoice_lines (%s::numeric[])", (list(batch_invoices),))
+    
+    line_objs = []
+    for old_invoice_id, rows in groupby(cursor.fetchall(), key=lambda r: r[0]):
+        lines = [row[1:] for row in rows]
+        line_objs.extend(build_invoice_lines(lines, batch_invoices[old_invoice_id], product_map, default_user))
     
-    for row in cursor.fetchall():
+    return line_objs
+
+def build_invoice_lines(lines, new_invoice, product_map, default_user):
+    """Build unsaved invoice lines for a specific invoice"""
+    
+    line_objs = []
+    
+    for row in lines:
         try:
-            product = None
+            product_id = None
             charge = None
             
             if row[2]:  # Product
-                product = product_map.get(row[2])
-                if not product:
+                product_id = product_map.get(row[2])
+                if not product_id:
                     print(f"    Warning: Product {row[2]} not found for Invoice line {row[0]}, skipping line")
                     continue
             
             # Skip lines with charges for now, focus on products
-            if row[8] and not product:  # Has charge but no product
+            if row[8] and not product_id:  # Has charge but no product
                 print(f"    Skipping charge line {row[0]} - charges not yet migrated")
                 continue
             
-            if not product:
+            if not product_id:
                 print(f"    Skipping line {row[0]} - no product or charge")
                 continue
             
-            # Create the line using proper Money objects
-            price_entered = Money(Decimal(str(row[4])), 'USD') if row[4] else Money(0, 'USD')
-            price_actual = Money(Decimal(str(row[5])), 'USD') if row[5] else price_entered
-            line_net_amount = Money(Decimal(str(row[6])), 'USD') if row[6] else Money(0, 'USD')
+            # psycopg2 already returns numeric columns as Decimal, so pass the
+            # raw amounts through and set the MoneyField currency columns directly
+            price_entered = row[4] or _ZERO
+            price_actual = row[5] or price_entered
+            line_net_amount = row[6] or _ZERO
             
-            InvoiceLine.objects.create(
+            line_objs.append(InvoiceLine(
                 invoice=new_invoice,
                 line_no=row[1],
-                product=product,
+                product_id=product_id,
                 charge=charge,
-                quantity_invoiced=Decimal(str(row[3])) if row[3] else Decimal('0.00'),
+                quantity_invoiced=row[3] or _ZERO,
                 price_entered=price_entered,
+                price_entered_currency='USD',
                 price_actual=price_actual,
-                price_list=price_entered,  # Set price_list same as price_entered
+                price_actual_currency='USD',
                 line_net_amount=line_net_amount,
+                line_net_amount_currency='USD',
                 description=row[7] or '',
                 created_by=default_user,
                 updated_by=default_user,
                 legacy_id=str(row[0])
-            )
-            
-            lines_created += 1
+            ))
             
         except Exception as e:
             print(f"  Error with Invoice Line {row[0]}: {str(e)}")
     
-    if lines_created > 0:
-        print(f"    Created {lines_created} lines")
-        # Recalculate invoice totals after adding lines
-        new_invoice.calculate_totals()
-    
-    return lines_created
+    return line_objs
 
 if __name__ == "__main__":
     print("Enhanced Invoice Migration with Invoice Lines")
@@ -10,6 +10,7 @@ import os
 import sys
 import django
 import pymysql
+import pymysql.cursors
 import re
 from decimal import Decimal
 from datetime import datetime
@@ -21,6 +22,26 @@ django.setup()
 from django.db import transaction
 from core.models import BusinessPartner, Organization, Currency, User, Opportunity
 
+# Opportunity number patterns in opp_code_c, e.g. "Q #123054", else any digits
+_RE_HASHNUM = re.compile(r'#(\d+)')
+_RE_ANYNUM = re.compile(r'(\d+)')
+
+# CRM sales stage substrings mapped to Django opportunity stages; first match wins
+_STAGE_RULES = (
+    (('proces',), 'proposal'),  # Processing likely means actively working on proposal
+    (('prospect',), 'prospecting'),
+    (('qualif',), 'qualification'),
+    (('proposal',), 'proposal'),
+    (('quote',), 'proposal'),
+    (('negotiat',), 'negotiation'),
+    (('closed', 'won'), 'closed_won'),
+    (('closed', 'lost'), 'closed_lost'),
+    (('hold',), 'on_hold'),
+)
+
+# Opportunities inserted per bulk_create
+OPPORTUNITY_BATCH_SIZE = 500
+
 def get_connection():
     """Get connection to remote CRM database"""
     if not hasattr(get_connection, 'connection'):
@@ -51,17 +72,9 @@ def extract_opportunity_number(opp_code_c):
     if not opp_code_c:
         return None
     
-    # Look for patterns like "Q #123054" or similar
-    match = re.search(r'#(\d+)', opp_code_c)
-    if match:
-        return match.group(1)
-    
-    # If no # pattern, try to extract any number sequence
-    match = re.search(r'(\d+)', opp_code_c)
-    if match:
-        return match.group(1)
-    
-    return None
+    # Look for patterns like "Q #123054", else any number sequence
+    match = _RE_HASHNUM.search(opp_code_c) or _RE_ANYNUM.search(opp_code_c)
+    return match.group(1) if match else None
 
 def map_sales_stage_to_opportunity_stage(sales_stage):
     """Map CRM sales stage to Django opportunity stage"""
@@ -69,25 +82,10 @@ def map_sales_stage_to_opportunity_stage(sales_stage):
         return 'prospecting'
     
     sales_stage_lower = sales_stage.lower()
-    
-    if 'proces' in sales_stage_lower:  # Updated to match 'Proces'
-        return 'proposal'  # Processing likely means actively working on proposal
-    elif 'prospect' in sales_stage_lower:
-        return 'prospecting'
-    elif 'qualif' in sales_stage_lower:
-        return 'qualification'
-    elif 'proposal' in sales_stage_lower or 'quote' in sales_stage_lower:
-        return 'proposal'
-    elif 'negotiat' in sales_stage_lower:
-        return 'negotiation'
-    elif 'closed' in sales_stage_lower and 'won' in sales_stage_lower:
-        return 'closed_won'
-    elif 'closed' in sales_stage_lower and 'lost' in sales_stage_lower:
-        return 'closed_lost'
-    elif 'hold' in sales_stage_lower:
-        return 'on_hold'
-    else:
-        return 'prospecting'  # Default
+    return next(
+        (stage for terms, stage in _STAGE_RULES if all(term in sales_stage_lower for term in terms)),
+        'prospecting'  # Default
+    )
 
 def get_or_create_default_data():
     """Get or create default data needed for opportunities"""
@@ -145,6 +143,7 @@ def truncate_opportunities():
     else:
         print("No existing opportunities to delete")
 
+@transaction.atomic
 def migrate_opportunities():
     """Migrate opportunities from CRM database"""
     print("Starting opportunity migration from CRM...")
@@ -157,7 +156,8 @@ def migrate_opportunities():
     
     # Connect to CRM database
     crm_conn = get_connection()
-    cursor = crm_conn.cursor()
+    # Unbuffered cursor: stream rows from MySQL instead of holding the whole result
+    cursor = crm_conn.cursor(pymysql.cursors.SSCursor)
     
     # Updated query to match your requirements
     query = """
@@ -193,81 +193,142 @@ def migrate_opportunities():
     """
     
     cursor.execute(query)
-    opportunities = cursor.fetchall()
-    
-    print(f"Found {len(opportunities)} opportunities with 'Proces' in sales_stage")
     
+    found_count = 0
     migrated_count = 0
     error_count = 0
     
-    for opp_data in opportunities:
+    # Legacy IDs already migrated, fetched once instead of queried per row
+    existing_ids = set(
+        Opportunity.objects.filter(legacy_id__isnull=False).values_list('legacy_id', flat=True)
+    )
+    batch = []
+    # Opportunities without a CRM number, numbered once the others are written
+    unnumbered = []
+    
+    for opp_data in cursor:
+        found_count += 1
+        crm_id = opp_data[0]
         try:
-            with transaction.atomic():
-                (crm_id, opp_code_c, name, date_entered, date_modified, modified_user_id, 
-                 created_by, description, deleted, assigned_user_id, opportunity_type,
-                 campaign_id, lead_source, amount, amount_usdollar, currency_id,
-                 date_closed, next_step, sales_stage, probability) = opp_data
-                
-                # Check if already migrated
-                existing = Opportunity.objects.filter(legacy_id=str(crm_id)).first()
-                if existing:
-                    print(f"Opportunity {crm_id} already exists, skipping...")
-                    continue
-                
-                # Extract opportunity number from opp_code_c
-                opportunity_number = extract_opportunity_number(opp_code_c)
-                
-                # Map sales stage
-                django_stage = map_sales_stage_to_opportunity_stage(sales_stage)
-                
-                # Format opportunity number in Q #XXXXXX format
-                formatted_opp_number = None
-                if opportunity_number:
-                    formatted_opp_number = f"Q #{opportunity_number}"
-                
-                # Create simplified opportunity (no business partner or other removed fields)
-                description_with_notes = description or ''
-                if description_with_notes:
-                    description_with_notes += '\n\n'
-                description_with_notes += f"Migrated from CRM. Original stage: {sales_stage}. Next step: {next_step or 'N/A'}. Opportunity code: {opp_code_c or 'N/A'}"
-                if amount_usdollar:
-                    description_with_notes += f"\nOriginal estimated value: ${amount_usdollar}"
-                if lead_source:
-                    description_with_notes += f"\nSource: {lead_source}"
-                if probability:
-                    description_with_notes += f"\nProbability: {probability}%"
-                
-                # Determine if opportunity is active based on stage
-                is_active = django_stage not in ['closed_won', 'closed_lost', 'closed'] if django_stage else True
-                
-                opportunity = Opportunity.objects.create(
-                    opportunity_number=formatted_opp_number,  # Use extracted number from CRM
-                    name=name or f"CRM Opportunity {crm_id}",
-                    description=description_with_notes,
-                    is_active=is_active,  # Active unless closed
-                    legacy_id=str(crm_id),
-                    created_by=default_user,
-                    updated_by=default_user
-                )
-                
-                migrated_count += 1
-                opp_number_display = f" (#{opportunity_number})" if opportunity_number else ""
-                print(f"Migrated opportunity {crm_id}{opp_number_display}: {opportunity.opportunity_number} - {name}")
-                
+            (crm_id, opp_code_c, name, date_entered, date_modified, modified_user_id, 
+             created_by, description, deleted, assigned_user_id, opportunity_type,
+             campaign_id, lead_source, amount, amount_usdollar, currency_id,
+             date_closed, next_step, sales_stage, probability) = opp_data
+            
+            # Check if already migrated
+            if str(crm_id) in existing_ids:
+                print(f"Opportunity {crm_id} already exists, skipping...")
+                continue
+            existing_ids.add(str(crm_id))
+            
+            # Extract opportunity number from opp_code_c
+            opportunity_number = extract_opportunity_number(opp_code_c)
+            
+            # Map sales stage
+            django_stage = map_sales_stage_to_opportunity_stage(sales_stage)
+            
+            # Format opportunity number in Q #XXXXXX format
+            formatted_opp_number = None
+            if opportunity_number:
+                formatted_opp_number = f"Q #{opportunity_number}"
+            
+            # Create simplified opportunity (no business partner or other removed fields)
+            description_with_notes = description or ''
+            if description_with_notes:
+                description_with_notes += '\n\n'
+            description_with_notes += f"Migrated from CRM. Original stage: {sales_stage}. Next step: {next_step or 'N/A'}. Opportunity code: {opp_code_c or 'N/A'}"
+            if amount_usdollar:
+                description_with_notes += f"\nOriginal estimated value: ${amount_usdollar}"
+            if lead_source:
+                description_with_notes += f"\nSource: {lead_source}"
+            if probability:
+                description_with_notes += f"\nProbability: {probability}%"
+            
+            # Determine if opportunity is active based on stage
+            is_active = django_stage not in ['closed_won', 'closed_lost', 'closed'] if django_stage else True
+            
+            opportunity = Opportunity(
+                opportunity_number=formatted_opp_number,  # Use extracted number from CRM
+                name=name or f"CRM Opportunity {crm_id}",
+                description=description_with_notes,
+                is_active=is_active,  # Active unless closed
+                legacy_id=str(crm_id),
+                created_by=default_user,
+                updated_by=default_user
+            )
+            if formatted_opp_number:
+                batch.append(opportunity)
+            else:
+                unnumbered.append(opportunity)
+            
         except Exception as e:
             error_count += 1
             print(f"ERROR migrating opportunity {crm_id}: {str(e)}")
             continue
+        
+        if len(batch) >= OPPORTUNITY_BATCH_SIZE:
+            batch_migrated, batch_errors = save_opportunity_batch(batch)
+            migrated_count += batch_migrated
+            error_count += batch_errors
+            batch = []
     
     cursor.close()
     crm_conn.close()
     
+    batch_migrated, batch_errors = save_opportunity_batch(batch)
+    migrated_count += batch_migrated
+    error_count += batch_errors
+    
+    # bulk_create skips Opportunity.save(), so number the rest the same way
+    # it would, continuing from the highest number written so far
+    number_opportunities(unnumbered)
+    for start in range(0, len(unnumbered), OPPORTUNITY_BATCH_SIZE):
+        batch_migrated, batch_errors = save_opportunity_batch(unnumbered[start:start + OPPORTUNITY_BATCH_SIZE])
+        migrated_count += batch_migrated
+        error_count += batch_errors
+    
     print(f"\nMigration completed!")
+    print(f"Found {found_count} opportunities with 'Proces' in sales_stage")
     print(f"Successfully migrated: {migrated_count} opportunities")
     print(f"Errors: {error_count}")
     
     return migrated_count, error_count
 
+def save_opportunity_batch(opportunities):
+    """Bulk insert a batch of opportunities, splitting a failing batch to isolate bad rows.
+    
+    Returns the number of opportunities written and the number that failed.
+    """
+    if not opportunities:
+        return 0, 0
+    
+    try:
+        # Savepoint, so a failing batch can be retried in halves
+        with transaction.atomic():
+            Opportunity.objects.bulk_create(opportunities)
+        print(f"Migrated {len(opportunities)} opportunities")
+        return len(opportunities), 0
+    
+    except Exception as e:
+        if len(opportunities) == 1:
+            print(f"ERROR migrating opportunity {opportunities[0].legacy_id}: {str(e)}")
+            return 0, 1
+        
+        middle = len(opportunities) // 2
+        first_migrated, first_errors = save_opportunity_batch(opportunities[:middle])
+        second_migrated, second_errors = save_opportunity_batch(opportunities[middle:])
+        return first_migrated + second_migrated, first_errors + second_errors
+
+def number_opportunities(opportunities):
+    """Assign consecutive Q #XXXXXX numbers, as Opportunity.save() would one at a time"""
+    if not opportunities:
+        return
+    
+    # One query for the next free number; the rest follow on from it
+    next_number = int(Opportunity()._generate_opportunity_number()[3:])
+    for offset, opportunity in enumerate(opportunities):
+        opportunity.opportunity_number = f"Q #{next_number + offset:06d}"
+
 if __name__ == "__main__":
     try:
         migrated, errors = migrate_opportunities()
@@ -21,6 +21,8 @@ from core.models import BusinessPartner, BusinessPartnerLocation, Contact, Payme
 from purchasing.models import PurchaseOrder, PurchaseOrderLine
 from inventory.models import Product, Warehouse, PriceList
 
+from _utils import build_legacy_map
+
 def migrate_purchase_orders():
     """Migrate purchase orders from iDempiere"""
     
@@ -44,31 +46,11 @@ def migrate_purchase_orders():
     print(f"Currency: {default_currency}, Payment Terms: {default_payment_terms}")
     print(f"Warehouse: {default_warehouse}, Price List: {default_price_list}")
     
-    # Create mappings
-    bp_map = {}
-    contact_map = {}
-    location_map = {}
-    product_map = {}
-    
-    # Build business partner mapping (ensure vendors for purchase orders)
-    for bp in BusinessPartner.objects.exclude(legacy_id__isnull=True):
-        if bp.legacy_id:
-            bp_map[int(bp.legacy_id)] = bp
-    
-    # Build contact mapping
-    for contact in Contact.objects.exclude(legacy_id__isnull=True):
-        if contact.legacy_id:
-            contact_map[int(contact.legacy_id)] = contact
-    
-    # Build location mapping
-    for location in BusinessPartnerLocation.objects.exclude(legacy_id__isnull=True):
-        if location.legacy_id:
-            location_map[int(location.legacy_id)] = location
-    
-    # Build product mapping
-    for product in Product.objects.exclude(legacy_id__isnull=True):
-        if product.legacy_id:
-            product_map[int(product.legacy_id)] = product
+    # Build mappings keyed by iDempiere ID
+    bp_map = build_legacy_map(BusinessPartner, instances=True)
+    contact_map = build_legacy_map(Contact, instances=True)
+    location_map = build_legacy_map(BusinessPartnerLocation, instances=True)
+    product_map = build_legacy_map(Product, instances=True)
     
     print(f"Loaded mappings: {len(bp_map)} BPs, {len(contact_map)} contacts, {len(location_map)} locations, {len(product_map)} products")
     
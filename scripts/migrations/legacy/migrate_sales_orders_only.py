@@ -21,6 +21,10 @@ from sales.models import SalesOrder, SalesOrderLine
 from inventory.models import Product, Warehouse, PriceList
 from core.models import Organization, Currency, User
 
+from _utils import SALES_ORDER_DOC_STATUS_MAP, build_legacy_map
+
+
+@transaction.atomic
 def migrate_sales_orders():
     """Migrate sales orders from iDempiere"""
     
@@ -45,24 +49,9 @@ def migrate_sales_orders():
     print(f"Warehouse: {default_warehouse}, Price List: {default_price_list}")
     
     # Create mappings
-    bp_map = {}
-    contact_map = {}
-    location_map = {}
-    
-    # Build business partner mapping
-    for bp in BusinessPartner.objects.exclude(legacy_id__isnull=True):
-        if bp.legacy_id:
-            bp_map[int(bp.legacy_id)] = bp
-    
-    # Build contact mapping
-    for contact in Contact.objects.exclude(legacy_id__isnull=True):
-        if contact.legacy_id:
-            contact_map[int(contact.legacy_id)] = contact
-    
-    # Build location mapping
-    for location in BusinessPartnerLocation.objects.exclude(legacy_id__isnull=True):
-        if location.legacy_id:
-            location_map[int(location.legacy_id)] = location
+    bp_map = build_legacy_map(BusinessPartner, instances=True)
+    contact_map = build_legacy_map(Contact, instances=True)
+    location_map = build_legacy_map(BusinessPartnerLocation, instances=True)
     
     print(f"Loaded mappings: {len(bp_map)} BPs, {len(contact_map)} contacts, {len(location_map)} locations")
     
@@ -71,7 +60,9 @@ def migrate_sales_orders():
     SalesOrderLine.objects.all().delete()
     SalesOrder.objects.all().delete()
     
-    cursor = idempiere_conn.cursor()
+    # Server-side cursor: stream orders in batches instead of fetchall()
+    cursor = idempiere_conn.cursor(name='c_order_stream', withhold=False)
+    cursor.itersize = 2000
     
     cursor.execute("""
         SELECT 
@@ -100,7 +91,7 @@ def migrate_sales_orders():
     orders_created = 0
     errors = []
     
-    for row in cursor.fetchall():
+    for row in cursor:
         try:
             bp = bp_map.get(row[6])
             if not bp:
@@ -111,40 +102,31 @@ def migrate_sales_orders():
             location = location_map.get(row[8]) if row[8] else None
             bill_to_location = location_map.get(row[9]) if row[9] else None
             
-            # Map document status
-            doc_status_map = {
-                'DR': 'drafted',
-                'IP': 'in_progress', 
-                'WP': 'waiting_payment',
-                'CO': 'complete',
-                'CL': 'closed',
-                'RE': 'reversed',
-                'VO': 'voided'
-            }
-            
-            sales_order = SalesOrder.objects.create(
-                organization=default_org,
-                document_no=row[1],
-                description=row[2] or '',
-                doc_status=doc_status_map.get(row[3], 'drafted'),
-                date_ordered=row[4],
-                date_promised=row[5],
-                business_partner=bp,
-                contact=contact,
-                business_partner_location=location,
-                bill_to_location=bill_to_location,
-                currency=default_currency,
-                price_list=default_price_list,
-                warehouse=default_warehouse,
-                payment_terms=default_payment_terms,
-                grand_total=Decimal(str(row[10])) if row[10] else Decimal('0.00'),
-                created=row[12],
-                created_by=default_user,
-                updated=row[14],
-                updated_by=default_user,
-                is_active=(row[16] == 'Y'),
-                legacy_id=str(row[0])
-            )
+            # Savepoint per order so a bad row only rolls back itself
+            with transaction.atomic():
+                sales_order = SalesOrder.objects.create(
+                    organization=default_org,
+                    document_no=row[1],
+                    description=row[2] or '',
+                    doc_status=SALES_ORDER_DOC_STATUS_MAP.get(row[3], 'drafted'),
+                    date_ordered=row[4],
+                    date_promised=row[5],
+                    business_partner=bp,
+                    contact=contact,
+                    business_partner_location=location,
+                    bill_to_location=bill_to_location,
+                    currency=default_currency,
+                    price_list=default_price_list,
+                    warehouse=default_warehouse,
+                    payment_terms=default_payment_terms,
+                    grand_total=Decimal(str(row[10])) if row[10] else Decimal('0.00'),
+                    created=row[12],
+                    created_by=default_user,
+                    updated=row[14],
+                    updated_by=default_user,
+                    is_active=(row[16] == 'Y'),
+                    legacy_id=str(row[0])
+                )
             
             orders_created += 1
             
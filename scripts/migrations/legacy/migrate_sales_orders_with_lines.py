@@ -14,29 +14,38 @@ import os
 import sys
 import django
 import psycopg2
+from contextlib import closing
 from decimal import Decimal
+from itertools import groupby
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'modern_erp.settings')
 django.setup()
 
-from django.db import transaction
+from django.db import connection, transaction
 from core.models import BusinessPartner, BusinessPartnerLocation, Contact, PaymentTerms, Organization, Currency, User
 from sales.models import SalesOrder, SalesOrderLine
 from inventory.models import Product, Warehouse, PriceList
 from djmoney.money import Money
 
+from _utils import SALES_ORDER_DOC_STATUS_MAP, build_legacy_map
+
+# Number of orders whose lines are fetched with a single c_orderline query
+LINE_FETCH_BATCH_SIZE = 1000
+ORDER_BULK_SIZE = 40
+LINE_BULK_SIZE = 500
+
+
+_ZERO = Decimal('0.00')
+_ZERO_USD = Money(0, 'USD')
+
+# Per-row diagnostics; off by default since a print per row dominates large runs
+VERBOSE = os.environ.get('MIGRATION_VERBOSE') == '1'
+
+@transaction.atomic
 def migrate_sales_orders_with_lines():
     """Migrate sales orders AND order lines from iDempiere"""
     
-    # Connect to iDempiere database
-    idempiere_conn = psycopg2.connect(
-        host='localhost',
-        database='idempiere',
-        user='django_user',
-        password='django_pass'
-    )
-    
     # Get default entities
     default_user = User.objects.first()
     default_org = Organization.objects.first()
@@ -49,168 +58,239 @@ def migrate_sales_orders_with_lines():
     print(f"Currency: {default_currency}, Payment Terms: {default_payment_terms}")
     print(f"Warehouse: {default_warehouse}, Price List: {default_price_list}")
     
-    # Create mappings
-    bp_map = {}
-    contact_map = {}
-    location_map = {}
-    product_map = {}
-    
-    # Build business partner mapping (ensure customers for sales orders)
-    for bp in BusinessPartner.objects.exclude(legacy_id__isnull=True):
-        if bp.legacy_id:
-            bp_map[int(bp.legacy_id)] = bp
-    
-    # Build contact mapping
-    for contact in Contact.objects.exclude(legacy_id__isnull=True):
-        if contact.legacy_id:
-            contact_map[int(contact.legacy_id)] = contact
-    
-    # Build location mapping
-    for location in BusinessPartnerLocation.objects.exclude(legacy_id__isnull=True):
-        if location.legacy_id:
-            location_map[int(location.legacy_id)] = location
-    
-    # Build product mapping
-    for product in Product.objects.exclude(legacy_id__isnull=True):
-        if product.legacy_id:
-            product_map[int(product.legacy_id)] = product
+    # Create mappings: only the PK is needed to set each FK, so skip
+    # loading full model instances
+    bp_map = build_legacy_map(BusinessPartner)
+    customer_bp_ids = set(BusinessPartner.objects.filter(is_customer=True).values_list('pk', flat=True))
+    contact_map = build_legacy_map(Contact)
+    location_map = build_legacy_map(BusinessPartnerLocation)
+    product_map = build_legacy_map(Product)
     
     print(f"Loaded mappings: {len(bp_map)} BPs, {len(contact_map)} contacts, {len(location_map)} locations, {len(product_map)} products")
     
     # Clear existing LEGACY sales orders only (preserve new orders)
     print("Clearing existing LEGACY sales orders...")
-    legacy_orders = SalesOrder.objects.exclude(legacy_id__isnull=True)
-    print(f"Found {legacy_orders.count()} legacy orders to remove")
+    legacy_ids = list(SalesOrder.objects.filter(legacy_id__isnull=False).values_list('id', flat=True))
+    print(f"Found {len(legacy_ids)} legacy orders to remove")
     
-    # Remove lines first, then orders
-    for order in legacy_orders:
-        order.lines.all().delete()
-    legacy_orders.delete()
+    # Remove lines first, then orders, with one DELETE each
+    SalesOrderLine.objects.filter(order_id__in=legacy_ids).delete()
+    SalesOrder.objects.filter(id__in=legacy_ids).delete()
     
     print("Preserving new orders (SO-14104, SO-14105, etc.)")
-    remaining_orders = SalesOrder.objects.filter(legacy_id__isnull=True)
+    remaining_orders = (
+        SalesOrder.objects.filter(legacy_id__isnull=True)
+        .select_related('business_partner')
+        .only('document_no', 'business_partner__name')
+    )
     for order in remaining_orders:
         print(f"  Preserved: {order.document_no} - {order.business_partner.name}")
     
-    cursor = idempiere_conn.cursor()
-    
-    # Get sales orders (issotrx = 'Y' for sales orders)
-    cursor.execute("""
-        SELECT 
-            o.c_order_id,
-            o.documentno,
-            o.description,
-            o.docstatus,
-            o.dateordered,
-            o.datepromised,
-            o.c_bpartner_id,
-            o.ad_user_id,
-            o.c_bpartner_location_id,
-            o.bill_location_id,
-            o.grandtotal,
-            o.issotrx,
-            o.created,
-            o.createdby,
-            o.updated,
-            o.updatedby,
-            o.isactive,
-            o.totallines
-        FROM adempiere.c_order o
-        WHERE o.issotrx = 'Y'  -- Sales orders only
-        ORDER BY o.c_order_id
-    """)
-    
-    orders_created = 0
-    lines_created = 0
-    errors = []
-    
-    for row in cursor.fetchall():
-        try:
-            bp = bp_map.get(row[6])
-            if not bp:
-                errors.append(f"No business partner found for SO {row[0]}")
-                continue
-            
-            # Ensure this BP is marked as a customer for sales orders
-            if not bp.is_customer:
-                bp.is_customer = True
-                bp.save()
-                print(f"  Updated BP {bp.name} to be a customer")
-            
-            contact = contact_map.get(row[7]) if row[7] else None
-            location = location_map.get(row[8]) if row[8] else None
-            bill_to_location = location_map.get(row[9]) if row[9] else None
-            
-            # Map document status for sales orders
-            doc_status_map = {
-                'DR': 'drafted',
-                'IP': 'in_progress', 
-                'WP': 'waiting_payment',    # SO specific status
-                'CO': 'complete',
-                'CL': 'closed',
-                'RE': 'reversed',
-                'VO': 'voided'
-            }
-            
-            sales_order = SalesOrder.objects.create(
-                organization=default_org,
-                document_no=row[1],
-                description=row[2] or 'Migrated from iDempiere',
-                doc_status=doc_status_map.get(row[3], 'drafted'),
-                date_ordered=row[4] or '2022-01-01',  # Provide default if null
-                date_promised=row[5],
-                business_partner=bp,
-                contact=contact,
-                business_partner_location=location,
-                bill_to_location=bill_to_location,
-                currency=default_currency,
-                price_list=default_price_list,
-                warehouse=default_warehouse,
-                payment_terms=default_payment_terms,
-                total_lines=Money(Decimal(str(row[17])), 'USD') if row[17] else Money(0, 'USD'),
-                grand_total=Money(Decimal(str(row[10])), 'USD') if row[10] else Money(0, 'USD'),
-                created=row[12],
-                created_by=default_user,
-                updated=row[14],
-                updated_by=default_user,
-                is_active=(row[16] == 'Y'),
-                legacy_id=str(row[0])
-            )
-            
-            # Migrate sales order lines
-            order_lines_created = migrate_sales_order_lines(cursor, row[0], sales_order, product_map, default_user)
-            lines_created += order_lines_created
+    # Connect to iDempiere database. The session is read-only since the
+    # extraction never writes there, and closing() plus the cursor context
+    # managers release everything even if the migration fails. Orders are
+    # streamed through a server-side cursor instead of fetchall(); lines are
+    # read on a separate client-side cursor since the named cursor stays
+    # open for the whole loop.
+    with closing(psycopg2.connect(
+        host='localhost',
+        database='idempiere',
+        user='django_user',
+        password='django_pass'
+    )) as idempiere_conn, \
+            idempiere_conn.cursor(name='so_stream', withhold=False) as cursor, \
+            idempiere_conn.cursor() as line_cursor:
+        idempiere_conn.set_session(readonly=True)
+        cursor.itersize = 10000
+        
+        # Get sales orders (issotrx = 'Y' for sales orders)
+        cursor.execute("""
+            SELECT 
+                o.c_order_id,
+                o.documentno,
+                o.description,
+                o.docstatus,
+                o.dateordered,
+                o.datepromised,
+                o.c_bpartner_id,
+                o.ad_user_id,
+                o.c_bpartner_location_id,
+                o.bill_location_id,
+                o.grandtotal,
+                o.issotrx,
+                o.created,
+                o.createdby,
+                o.updated,
+                o.updatedby,
+                o.isactive,
+                o.totallines
+            FROM adempiere.c_order o
+            WHERE o.issotrx = 'Y'  -- Sales orders only
+            ORDER BY o.c_order_id
+        """)
+        
+        orders_created = 0
+        lines_created = 0
+        errors = []
+        # iDempiere c_orderline_ids skipped while building lines, by reason
+        skipped_lines = {'missing_product': [], 'charge': [], 'no_product': []}
+        batch_orders = {}
+        # Business partners of the orders actually written, flagged as customers after the loop
+        written_bp_ids = set()
+        
+        for row in cursor:
+            try:
+                bp_id = bp_map.get(row[6])
+                if not bp_id:
+                    errors.append(f"No business partner found for SO {row[0]}")
+                    continue
+                
+                contact_id = contact_map.get(row[7]) if row[7] else None
+                location_id = location_map.get(row[8]) if row[8] else None
+                bill_to_location_id = location_map.get(row[9]) if row[9] else None
+                
+                sales_order = SalesOrder(
+                    organization=default_org,
+                    document_no=row[1],
+                    description=row[2] or 'Migrated from iDempiere',
+                    doc_status=SALES_ORDER_DOC_STATUS_MAP.get(row[3], 'drafted'),
+                    date_ordered=row[4] or '2022-01-01',  # Provide default if null
+                    date_promised=row[5],
+                    business_partner_id=bp_id,
+                    contact_id=contact_id,
+                    business_partner_location_id=location_id,
+                    bill_to_location_id=bill_to_location_id,
+                    currency=default_currency,
+                    price_list=default_price_list,
+                    warehouse=default_warehouse,
+                    payment_terms=default_payment_terms,
+                    total_lines=Money(row[17], 'USD') if row[17] else _ZERO_USD,
+                    grand_total=Money(row[10], 'USD') if row[10] else _ZERO_USD,
+                    created=row[12],
+                    created_by=default_user,
+                    updated=row[14],
+                    updated_by=default_user,
+                    is_active=(row[16] == 'Y'),
+                    legacy_id=str(row[0])
+                )
+                
+                batch_orders[row[0]] = sales_order
+                
+                if orders_created + len(batch_orders) <= 10:
+                    print(f"  Prepared SO: {sales_order.document_no}")
             
-            orders_created += 1
+            except Exception as e:
+                errors.append(f"Sales Order {row[0]}: {str(e)}")
+                if VERBOSE:
+                    print(f"  Error with SO {row[0]}: {str(e)}")
             
-            if orders_created <= 10:
-                print(f"  Created SO: {sales_order.document_no} - {bp.name}")
-                if contact:
-                    print(f"    Contact: {contact.name}")
-                if order_lines_created > 0:
-                    print(f"    Lines: {order_lines_created}")
-                    
-        except Exception as e:
-            errors.append(f"Sales Order {row[0]}: {str(e)}")
-            print(f"  Error with SO {row[0]}: {str(e)}")
+            # Write orders and their lines a whole batch at a time
+            if len(batch_orders) >= LINE_FETCH_BATCH_SIZE:
+                written, batch_lines_created = save_order_batch(
+                    line_cursor, batch_orders, product_map, default_user, errors, skipped_lines)
+                orders_created += len(written)
+                lines_created += batch_lines_created
+                written_bp_ids.update(order.business_partner_id for order in written)
+                batch_orders = {}
+        
+        written, batch_lines_created = save_order_batch(
+            line_cursor, batch_orders, product_map, default_user, errors, skipped_lines)
+        orders_created += len(written)
+        lines_created += batch_lines_created
+        written_bp_ids.update(order.business_partner_id for order in written)
     
-    cursor.close()
-    idempiere_conn.close()
+    # Ensure the BPs are marked as customers for sales orders
+    bp_needs_customer = written_bp_ids - customer_bp_ids
+    if bp_needs_customer:
+        BusinessPartner.objects.filter(pk__in=bp_needs_customer).update(is_customer=True)
+        print(f"Updated {len(bp_needs_customer)} BPs to be customers")
+    
+    update_legacy_order_totals()
     
     print(f"\nMigration completed:")
     print(f"  Sales Orders: {orders_created}")
     print(f"  Order Lines: {lines_created}")
     
+    if skipped_lines['missing_product']:
+        print(f"Skipped {len(skipped_lines['missing_product'])} lines due to missing products")
+    if skipped_lines['charge']:
+        print(f"Skipped {len(skipped_lines['charge'])} charge lines (charges not yet migrated)")
+    if skipped_lines['no_product']:
+        print(f"Skipped {len(skipped_lines['no_product'])} lines with no product or charge")
+    
     if errors:
         print(f"Errors: {len(errors)}")
         for error in errors[:10]:
             print(f"  - {error}")
 
-def migrate_sales_order_lines(cursor, old_order_id, new_order, product_map, default_user):
-    """Migrate sales order lines for a specific order"""
+def save_order_batch(cursor, batch_orders, product_map, default_user, errors, skipped_lines):
+    """Bulk insert a batch of sales orders keyed by iDempiere c_order_id, with their lines.
+    
+    A failing batch is split and retried so a bad order only loses itself.
+    Returns the orders written and the number of lines written.
+    """
+    
+    if not batch_orders:
+        return [], 0
+    
+    # Line errors and skips are only kept once the batch is written, so a
+    # retried half doesn't report them twice
+    batch_errors = []
+    batch_skipped = {reason: [] for reason in skipped_lines}
+    try:
+        with transaction.atomic():
+            SalesOrder.objects.bulk_create(batch_orders.values(), batch_size=ORDER_BULK_SIZE)
+            
+            line_objs = build_batch_order_lines(
+                cursor, batch_orders, product_map, default_user, batch_errors, batch_skipped)
+            SalesOrderLine.objects.bulk_create(line_objs, batch_size=LINE_BULK_SIZE)
+    
+    except Exception as e:
+        if len(batch_orders) == 1:
+            old_order_id = next(iter(batch_orders))
+            errors.append(f"Sales Order {old_order_id}: {str(e)}")
+            print(f"  Error with SO {old_order_id}: {str(e)}")
+            return [], 0
+        
+        items = list(batch_orders.items())
+        middle = len(items) // 2
+        first_written, first_lines = save_order_batch(
+            cursor, dict(items[:middle]), product_map, default_user, errors, skipped_lines)
+        second_written, second_lines = save_order_batch(
+            cursor, dict(items[middle:]), product_map, default_user, errors, skipped_lines)
+        return first_written + second_written, first_lines + second_lines
+    
+    errors.extend(batch_errors)
+    for reason, line_ids in batch_skipped.items():
+        skipped_lines[reason].extend(line_ids)
+    return list(batch_orders.values()), len(line_objs)
+
+def update_legacy_order_totals():
+    """Recalculate totals of legacy sales orders that have lines with one aggregate UPDATE"""
+    
+    # Same result as SalesOrder.calculate_totals() (no tax yet), which
+    # SalesOrderLine.save() would otherwise run for every line
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {SalesOrder._meta.db_table} o
+            SET total_lines = s.total,
+                grand_total = s.total
+            FROM (
+                SELECT order_id, SUM(line_net_amount) AS total
+                FROM {SalesOrderLine._meta.db_table}
+                GROUP BY order_id
+            ) s
+            WHERE s.order_id = o.id
+              AND o.legacy_id IS NOT NULL
+        """)
+        print(f"Recalculated totals for {cursor.rowcount} sales orders")
+
+def build_batch_order_lines(cursor, batch_orders, product_map, default_user, errors, skipped_lines):
+    """Build sales order lines for a batch of orders keyed by iDempiere c_order_id"""
     
     cursor.execute("""
         SELECT 
+            ol.c_order_id,
             ol.c_orderline_id,
             ol.line,
             ol.m_product_id,
@@ -221,43 +301,60 @@ def migrate_sales_order_lines(cursor, old_order_id, new_order, product_map, defa
             ol.description,
             ol.c_charge_id
         FROM adempiere.c_orderline ol
-        WHERE ol.c_order_id = %s
-        ORDER BY ol.line
-    """, (old_order_id,))
+        WHERE ol.c_order_id = ANY(%s)
+        ORDER BY ol.c_order_id, ol.line
+    """, (list(batch_orders),))
+    
+    line_objs = []
+    for old_order_id, rows in groupby(cursor.fetchall(), key=lambda r: r[0]):
+        lines = [row[1:] for row in rows]
+        line_objs.extend(build_order_lines(
+            lines, batch_orders[old_order_id], product_map, default_user, errors, skipped_lines))
+    
+    return line_objs
+
+def build_order_lines(lines, new_order, product_map, default_user, errors, skipped_lines):
+    """Build unsaved sales order lines for a specific order, recording skipped lines by reason"""
     
-    lines_created = 0
+    line_objs = []
     
-    for row in cursor.fetchall():
+    for row in lines:
         try:
-            product = None
+            product_id = None
             charge = None
             
             if row[2]:  # Product
-                product = product_map.get(row[2])
-                if not product:
-                    print(f"    Warning: Product {row[2]} not found for SO line {row[0]}, skipping line")
+                product_id = product_map.get(row[2])
+                if not product_id:
+                    skipped_lines['missing_product'].append(row[0])
+                    if VERBOSE:
+                        print(f"    Warning: Product {row[2]} not found for SO line {row[0]}, skipping line")
                     continue
             
             # Skip lines with charges for now, focus on products
-            if row[8] and not product:  # Has charge but no product
-                print(f"    Skipping charge line {row[0]} - charges not yet migrated")
+            if row[8] and not product_id:  # Has charge but no product
+                skipped_lines['charge'].append(row[0])
+                if VERBOSE:
+                    print(f"    Skipping charge line {row[0]} - charges not yet migrated")
                 continue
             
-            if not product:
-                print(f"    Skipping line {row[0]} - no product or charge")
+            if not product_id:
+                skipped_lines['no_product'].append(row[0])
+                if VERBOSE:
+                    print(f"    Skipping line {row[0]} - no product or charge")
                 continue
             
             # Create the line using proper Money objects
-            price_entered = Money(Decimal(str(row[4])), 'USD') if row[4] else Money(0, 'USD')
-            price_actual = Money(Decimal(str(row[5])), 'USD') if row[5] else price_entered
-            line_net_amount = Money(Decimal(str(row[6])), 'USD') if row[6] else Money(0, 'USD')
+            price_entered = Money(row[4], 'USD') if row[4] else _ZERO_USD
+            price_actual = Money(row[5], 'USD') if row[5] else price_entered
+            line_net_amount = Money(row[6], 'USD') if row[6] else _ZERO_USD
             
-            SalesOrderLine.objects.create(
+            line_objs.append(SalesOrderLine(
                 order=new_order,
                 line_no=row[1],
-                product=product,
+                product_id=product_id,
                 charge=charge,
-                quantity_ordered=Decimal(str(row[3])) if row[3] else Decimal('0.00'),
+                quantity_ordered=row[3] if row[3] else _ZERO,
                 price_entered=price_entered,
                 price_actual=price_actual,
                 price_list=price_entered,  # Set price_list same as price_entered
@@ -266,19 +363,14 @@ def migrate_sales_order_lines(cursor, old_order_id, new_order, product_map, defa
                 created_by=default_user,
                 updated_by=default_user,
                 legacy_id=str(row[0])
-            )
-            
-            lines_created += 1
+            ))
             
         except Exception as e:
-            print(f"  Error with SO Line {row[0]}: {str(e)}")
-    
-    if lines_created > 0:
-        print(f"    Created {lines_created} lines")
-        # Recalculate order totals after adding lines
-        new_order.calculate_totals()
+            errors.append(f"Sales Order Line {row[0]}: {str(e)}")
+            if VERBOSE:
+                print(f"  Error with SO Line {row[0]}: {str(e)}")
     
-    return lines_created
+    return line_objs
 
 if __name__ == "__main__":
     print("Enhanced Sales Orders Migration with Order Lines")
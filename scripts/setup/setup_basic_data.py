@@ -19,10 +19,12 @@ from datetime import date
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'modern_erp.settings')
 django.setup()
 
+from django.db import transaction
 from core.models import Organization, Currency, UnitOfMeasure, User
 from inventory.models import ProductCategory, PriceList, Warehouse
 
 
+@transaction.atomic
 def create_basic_data():
     """Create essential master data"""
     print("Creating basic master data...")
@@ -70,19 +72,17 @@ def create_basic_data():
         {'code': 'M', 'name': 'Meter', 'symbol': 'm', 'precision': 2},
     ]
     
-    for uom_data in uoms:
-        uom, created = UnitOfMeasure.objects.get_or_create(
-            code=uom_data['code'],
-            defaults={
-                'name': uom_data['name'],
-                'symbol': uom_data['symbol'],
-                'precision': uom_data['precision'],
-                'created_by': admin_user,
-                'updated_by': admin_user,
-            }
-        )
-        if created:
-            print(f"Created UOM: {uom.name}")
+    # One SELECT for the existing codes and one INSERT for the rest;
+    # ignore_conflicts keeps reruns idempotent via the unique code
+    existing_codes = set(
+        UnitOfMeasure.objects.filter(code__in=[d['code'] for d in uoms]).values_list('code', flat=True)
+    )
+    new_uoms = UnitOfMeasure.objects.bulk_create([
+        UnitOfMeasure(**uom_data, created_by=admin_user, updated_by=admin_user)
+        for uom_data in uoms if uom_data['code'] not in existing_codes
+    ], ignore_conflicts=True)
+    for uom in new_uoms:
+        print(f"Created UOM: {uom.name}")
     
     # Create Product Categories
     categories = [
@@ -92,17 +92,15 @@ def create_basic_data():
         {'code': 'FINISHED', 'name': 'Finished Goods'},
     ]
     
-    for cat_data in categories:
-        cat, created = ProductCategory.objects.get_or_create(
-            code=cat_data['code'],
-            defaults={
-                'name': cat_data['name'],
-                'created_by': admin_user,
-                'updated_by': admin_user,
-            }
-        )
-        if created:
-            print(f"Created Product Category: {cat.name}")
+    existing_codes = set(
+        ProductCategory.objects.filter(code__in=[d['code'] for d in categories]).values_list('code', flat=True)
+    )
+    new_categories = ProductCategory.objects.bulk_create([
+        ProductCategory(**cat_data, created_by=admin_user, updated_by=admin_user)
+        for cat_data in categories if cat_data['code'] not in existing_codes
+    ], ignore_conflicts=True)
+    for cat in new_categories:
+        print(f"Created Product Category: {cat.name}")
     
     # Create Price Lists
     price_lists = [